@@ -1,19 +1,150 @@
 # [P-12.56] Implement a nonrecursive, in-place version of the quick-sort algorithm, as
 # described at the end of Section 12.3.2.
 
+import heapq
+import mmap
+import operator
+import os
 import random
-from typing import List
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from multiprocessing import Pool, shared_memory
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List
 
-def inplace_quick_sort(S: List[int], a: int, b: int) -> None:
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+INSERTION_SORT_CUTOFF = 16
+NINTHER_THRESHOLD = 128
+DISTINCT_SAMPLE_SIZE = 128
+DISTINCT_RATIO = 0.75
+PARALLEL_THRESHOLD = 200_000
+PARALLEL_TASKS_PER_PROCESS = 4
+NUMPY_LEAF_SIZE = 1 << 14
+EXTERNAL_MEMORY_LIMIT = 64 * 1024 * 1024
+EXTERNAL_FAN_IN = 64
+
+def inplace_quick_sort(
+  S: List[Any] | array | memoryview,
+  a: int,
+  b: int,
+  hybrid: bool = True,
+  three_way: bool | None = None,
+  *,
+  key: Callable[[Any], Any] | None = None,
+  reverse: bool = False
+) -> None:
   """
   Sorts the list S in-place using a nonrecursive quick-sort algorithm.
 
-  Uses an explicit stack to simulate recursion.
+  Uses an explicit stack to simulate recursion. By default the hybrid
+  (introsort) engine is used: median-of-three/ninther pivots, insertion sort
+  for small ranges, smaller-partition-first processing and a heap-sort
+  fallback once the depth budget is exhausted. Passing hybrid=False runs the
+  classic textbook version that always pivots on S[b].
+
+  With three_way=True every range is split into <, == and > pivot parts and
+  the == part is never visited again. When three_way is None the mode is
+  chosen by sampling S[a:b+1] for repeated keys.
+
+  If key is given, key(x) is computed once per element and stored in a
+  parallel list that is swapped together with S. reverse=True sorts in
+  descending order by flipping the comparison used while partitioning.
+
+  Besides lists, S may be any writable one-dimensional buffer such as
+  array.array, bytearray or memoryview; it is sorted in place through its
+  own storage, without converting it to a list. NumPy arrays (without key)
+  are sorted with vectorized three-way partitioning.
   """
-  
+
   if a >= b:
     return
 
+  if not isinstance(S, (list, array)):
+    if np is not None and isinstance(S, np.ndarray) and key is None:
+      _numpy_quick_sort(S, a, b, reverse)
+      return
+    S = _as_writable_view(S)
+
+  K, V = _parallel_keys(S, a, b, key)
+  less = operator.gt if reverse else operator.lt
+
+  if three_way is None:
+    three_way = _has_few_distinct(K, a, b)
+
+  if hybrid:
+    _hybrid_quick_sort(K, V, a, b, less, three_way)
+  else:
+    _classic_quick_sort(K, V, a, b, less, three_way)
+
+def _parallel_keys(
+  S: List[Any],
+  a: int,
+  b: int,
+  key: Callable[[Any], Any] | None
+) -> tuple[List[Any], List[Any] | None]:
+  """
+  Returns (K, V): the keys to compare and the values to move along with them.
+
+  Without a key function the elements are their own keys and V is None.
+  Otherwise K[i] holds key(S[i]) for a <= i <= b, computed exactly once.
+  """
+  if key is None:
+    return S, None
+  K = [None] * a
+  K.extend(key(S[i]) for i in range(a, b + 1))
+  return K, S
+
+def _hybrid_quick_sort(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool],
+  three_way: bool
+) -> None:
+  """Introsort engine behind inplace_quick_sort (see its docstring)."""
+  # Smaller partition is always processed first, so the stack holds O(log n) ranges
+  stack = [(a, b, 2 * (b - a + 1).bit_length())]
+
+  while stack:
+    a, b, depth = stack.pop()
+
+    while b - a >= INSERTION_SORT_CUTOFF:
+      if depth == 0:
+        _heap_sort(K, V, a, b, less)
+        break
+      depth -= 1
+
+      _select_pivot(K, V, a, b, less)
+      if three_way:
+        lt, gt = _partition_three_way(K, V, a, b, less)
+      else:
+        lt = gt = _partition(K, V, a, b, less)
+
+      if lt - a < b - gt:
+        stack.append((gt + 1, b, depth))
+        b = lt - 1
+      else:
+        stack.append((a, lt - 1, depth))
+        a = gt + 1
+    else:
+      _insertion_sort(K, V, a, b, less)
+
+def _classic_quick_sort(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool],
+  three_way: bool = False
+) -> None:
+  """Textbook nonrecursive quick-sort that always pivots on the last element."""
   stack = []
   stack.append((a, b))
 
@@ -23,27 +154,728 @@ def inplace_quick_sort(S: List[int], a: int, b: int) -> None:
     if a >= b:
       continue
 
-    pivot = S[b]
-    left = a
-    right = b - 1
+    if three_way:
+      lt, gt = _partition_three_way(K, V, a, b, less)
+    else:
+      lt = gt = _partition(K, V, a, b, less)
+
+    stack.append((a, lt - 1))
+    stack.append((gt + 1, b))
+
+# The helpers below order the keys K with less() and apply every move to the
+# parallel value list V as well, unless V is None (keys are the values).
+
+def _partition(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool]
+) -> int:
+  """
+  Partitions K[a:b+1] around the pivot K[b] and returns its final index.
+  """
+  pivot = K[b]
+  left = a
+  right = b - 1
+
+  while left <= right:
+    while left <= right and less(K[left], pivot):
+      left += 1
+    while left <= right and less(pivot, K[right]):
+      right -= 1
+    if left <= right:
+      K[left], K[right] = K[right], K[left]
+      if V is not None:
+        V[left], V[right] = V[right], V[left]
+      left, right = left + 1, right - 1
+
+  K[left], K[b] = K[b], K[left]
+  if V is not None:
+    V[left], V[b] = V[b], V[left]
+  return left
+
+def _partition_three_way(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool]
+) -> tuple[int, int]:
+  """
+  Dutch national flag partition of K[a:b+1] around the pivot K[b].
+
+  Returns (lt, gt) such that K[a:lt] < pivot, K[lt:gt+1] == pivot and
+  K[gt+1:b+1] > pivot (with respect to less).
+  """
+  pivot = K[b]
+  lt = i = a
+  gt = b
+
+  while i <= gt:
+    current = K[i]
+    if less(current, pivot):
+      K[lt], K[i] = current, K[lt]
+      if V is not None:
+        V[lt], V[i] = V[i], V[lt]
+      lt, i = lt + 1, i + 1
+    elif less(pivot, current):
+      K[i], K[gt] = K[gt], current
+      if V is not None:
+        V[i], V[gt] = V[gt], V[i]
+      gt -= 1
+    else:
+      i += 1
+
+  return lt, gt
+
+def _has_few_distinct(K: List[Any], a: int, b: int) -> bool:
+  """
+  Samples K[a:b+1] and returns True if the keys repeat often enough for
+  three-way partitioning to pay off.
+  """
+  n = b - a + 1
+  if n <= INSERTION_SORT_CUTOFF:
+    return False
+
+  step = max(1, n // DISTINCT_SAMPLE_SIZE)
+  sample = sorted(K[i] for i in range(a, b + 1, step))
+  distinct = 1
+  for i in range(1, len(sample)):
+    if sample[i - 1] < sample[i]:
+      distinct += 1
+  return distinct <= DISTINCT_RATIO * len(sample)
+
+def _median_of_three(
+  K: List[Any],
+  i: int,
+  j: int,
+  k: int,
+  less: Callable[[Any, Any], bool]
+) -> int:
+  """Returns the index of the median of K[i], K[j] and K[k]."""
+  if less(K[i], K[j]):
+    if less(K[j], K[k]):
+      return j
+    return k if less(K[i], K[k]) else i
+  if less(K[i], K[k]):
+    return i
+  return k if less(K[j], K[k]) else j
+
+def _select_pivot(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool]
+) -> None:
+  """
+  Moves a median-of-three (or ninther for large ranges) pivot into K[b].
+  """
+  mid = (a + b) // 2
+  if b - a >= NINTHER_THRESHOLD:
+    step = (b - a) // 8
+    m = _median_of_three(
+      K,
+      _median_of_three(K, a, a + step, a + 2 * step, less),
+      _median_of_three(K, mid - step, mid, mid + step, less),
+      _median_of_three(K, b - 2 * step, b - step, b, less),
+      less
+    )
+  else:
+    m = _median_of_three(K, a, mid, b, less)
+  K[m], K[b] = K[b], K[m]
+  if V is not None:
+    V[m], V[b] = V[b], V[m]
+
+def _insertion_sort(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool]
+) -> None:
+  """Sorts the small range K[a:b+1] in-place using insertion sort."""
+  for i in range(a + 1, b + 1):
+    current = K[i]
+    value = V[i] if V is not None else None
+    j = i
+    while j > a and less(current, K[j - 1]):
+      K[j] = K[j - 1]
+      if V is not None:
+        V[j] = V[j - 1]
+      j -= 1
+    K[j] = current
+    if V is not None:
+      V[j] = value
+
+def _heap_sort(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  less: Callable[[Any, Any], bool]
+) -> None:
+  """Sorts K[a:b+1] in-place using heap-sort (guaranteed O(n log n))."""
+  n = b - a + 1
+
+  def sift_down(root: int, end: int) -> None:
+    current = K[a + root]
+    value = V[a + root] if V is not None else None
+    child = 2 * root + 1
+    while child < end:
+      if child + 1 < end and less(K[a + child], K[a + child + 1]):
+        child += 1
+      if not less(current, K[a + child]):
+        break
+      K[a + root] = K[a + child]
+      if V is not None:
+        V[a + root] = V[a + child]
+      root = child
+      child = 2 * root + 1
+    K[a + root] = current
+    if V is not None:
+      V[a + root] = value
+
+  for root in range(n // 2 - 1, -1, -1):
+    sift_down(root, n)
+  for end in range(n - 1, 0, -1):
+    K[a], K[a + end] = K[a + end], K[a]
+    if V is not None:
+      V[a], V[a + end] = V[a + end], V[a]
+    sift_down(0, end)
+
+def select(
+  S: List[Any] | array | memoryview,
+  k: int,
+  *,
+  key: Callable[[Any], Any] | None = None,
+  reverse: bool = False
+) -> Any:
+  """
+  Returns the k-th smallest element of S (0-based), like C++ nth_element.
+
+  S is rearranged in-place so that S[k] holds the element that would be
+  there if S were sorted, with no larger element before it and no smaller
+  element after it. Runs in expected O(n) time.
+
+  Raises:
+    IndexError: If k is out of range.
+  """
+  return select_many(S, [k], key=key, reverse=reverse)[0]
+
+def select_many(
+  S: List[Any] | array | memoryview,
+  ks: Iterable[int],
+  *,
+  key: Callable[[Any], Any] | None = None,
+  reverse: bool = False
+) -> list[Any]:
+  """
+  Places several order statistics of S at their sorted positions at once.
+
+  All requested ranks share the same partitioning passes: after each
+  partition the ranks are split between the two sides and a side without
+  any rank is never visited again. Returns [S[k] for k in ks].
+
+  Raises:
+    IndexError: If any k is out of range.
+  """
+  ks = list(ks)
+  if not isinstance(S, (list, array)):
+    S = _as_writable_view(S)
+
+  n = len(S)
+  for k in ks:
+    if not -n <= k < n:
+      raise IndexError('Rank is out of range.')
+  ks = [k % n for k in ks]
+
+  if ks:
+    K, V = _parallel_keys(S, 0, n - 1, key)
+    less = operator.gt if reverse else operator.lt
+    _select_ranks(K, V, 0, n - 1, sorted(set(ks)), less)
+
+  return [S[k] for k in ks]
+
+def quantiles(
+  S: List[Any] | array | memoryview,
+  qs: Iterable[float],
+  *,
+  key: Callable[[Any], Any] | None = None
+) -> list[Any]:
+  """
+  Returns the elements of S at the given quantiles (0 <= q <= 1).
+
+  The q-quantile is the element at index floor(q * (n - 1)) of the sorted
+  order. All quantiles are selected in one pass with select_many.
+
+  Raises:
+    ValueError: If S is empty or a quantile is outside [0, 1].
+  """
+  n = len(S)
+  if n == 0:
+    raise ValueError('Quantiles of an empty sequence are undefined.')
+
+  ks = []
+  for q in qs:
+    if not 0 <= q <= 1:
+      raise ValueError(f'Quantile {q} is not between 0 and 1.')
+    ks.append(int(q * (n - 1)))
+  return select_many(S, ks, key=key)
+
+def partial_sort(
+  S: List[Any] | array | memoryview,
+  k: int,
+  *,
+  key: Callable[[Any], Any] | None = None,
+  reverse: bool = False
+) -> None:
+  """
+  Rearranges S in-place so that S[:k] holds its k smallest elements in
+  sorted order; the order of the remaining elements is unspecified.
+
+  The k-th element is selected first and only S[:k] is sorted afterwards,
+  which takes expected O(n + k log k) time. Keys are computed once.
+  """
+  if not isinstance(S, (list, array)):
+    S = _as_writable_view(S)
+
+  n = len(S)
+  k = min(max(k, 0), n)
+  if k == 0:
+    return
+
+  K, V = _parallel_keys(S, 0, n - 1, key)
+  less = operator.gt if reverse else operator.lt
+  _select_ranks(K, V, 0, n - 1, [k - 1], less)
+  _hybrid_quick_sort(K, V, 0, k - 1, less, _has_few_distinct(K, 0, k - 1))
+
+def top_k(
+  iterable: Iterable[Any],
+  k: int,
+  *,
+  key: Callable[[Any], Any] | None = None
+) -> list[Any]:
+  """Returns the k largest items of iterable, largest first."""
+  items = list(iterable)
+  k = max(k, 0)
+  partial_sort(items, k, key=key, reverse=True)
+  return items[:k]
+
+def _select_ranks(
+  K: List[Any],
+  V: List[Any] | None,
+  a: int,
+  b: int,
+  ks: list[int],
+  less: Callable[[Any, Any], bool]
+) -> None:
+  """
+  Moves the elements of ranks ks (sorted, within [a, b]) into place.
+
+  Uses the same pivot selection and partitioning as the sort. Ranges that
+  exceed the depth budget are heap-sorted, so adversarial inputs cannot
+  push the running time beyond O(n log n).
+  """
+  three_way = _has_few_distinct(K, a, b)
+  stack = [(a, b, ks, 2 * (b - a + 1).bit_length())]
+
+  while stack:
+    a, b, ks, depth = stack.pop()
+
+    if b - a < INSERTION_SORT_CUTOFF:
+      _insertion_sort(K, V, a, b, less)
+      continue
+    if depth == 0:
+      _heap_sort(K, V, a, b, less)
+      continue
+
+    _select_pivot(K, V, a, b, less)
+    if three_way:
+      lt, gt = _partition_three_way(K, V, a, b, less)
+    else:
+      lt = gt = _partition(K, V, a, b, less)
+
+    left = [k for k in ks if k < lt]
+    right = [k for k in ks if k > gt]
+    if left:
+      stack.append((a, lt - 1, left, depth - 1))
+    if right:
+      stack.append((gt + 1, b, right, depth - 1))
+
+def _as_writable_view(S: Any) -> Any:
+  """
+  Returns a memoryview of the buffer S that supports item assignment.
+
+  Objects that do not implement the buffer protocol are returned unchanged
+  and sorted through their own __getitem__/__setitem__.
+
+  Raises:
+    TypeError: If the buffer is read-only.
+    ValueError: If the buffer is not one-dimensional.
+  """
+  try:
+    view = memoryview(S)
+  except TypeError:
+    return S
+
+  if view.readonly:
+    raise TypeError('Cannot sort a read-only buffer.')
+  if view.ndim != 1:
+    raise ValueError('Only one-dimensional buffers can be sorted.')
+
+  # memoryview only indexes native single-character formats ('<i' -> 'i')
+  code = view.format.lstrip('@=<>!')
+  if code != view.format and struct.calcsize(code) == view.itemsize:
+    if view.format[0] in '@=' or (view.format[0] == '<') == (sys.byteorder == 'little'):
+      view = view.cast('B').cast(code)
+  return view
+
+def _numpy_quick_sort(S: Any, a: int, b: int, reverse: bool) -> None:
+  """
+  Sorts the NumPy array S[a:b+1] in-place with vectorized partitioning.
+
+  Every range is split into <, == and > pivot blocks using boolean masks,
+  so each partition step is a handful of array operations. Ranges shorter
+  than NUMPY_LEAF_SIZE (or past the depth budget) are finished by NumPy's
+  own sort. NaNs are ordered after all other values, as in numpy.sort.
+  """
+  stack = [(a, b, 2 * (b - a + 1).bit_length())]
+
+  while stack:
+    a, b, depth = stack.pop()
+    segment = S[a:b + 1]
+    n = b - a + 1
+
+    if n <= NUMPY_LEAF_SIZE or depth == 0:
+      if reverse:
+        segment[::-1].sort()
+      else:
+        segment.sort()
+      continue
+
+    sample = np.sort(segment[np.linspace(0, n - 1, 9).astype(np.intp)])
+    pivot = sample[4]
+
+    if segment.dtype.kind == 'f':
+      nan = np.isnan(segment)
+      if np.isnan(pivot):
+        lower, upper = ~nan, np.zeros(n, dtype=bool)
+      else:
+        lower, upper = segment < pivot, (segment > pivot) | nan
+    else:
+      lower, upper = segment < pivot, segment > pivot
+
+    if reverse:
+      lower, upper = upper, lower
+
+    first = segment[lower]
+    middle = segment[~(lower | upper)]
+    last = segment[upper]
+
+    lt, gt = len(first), n - len(last)
+    segment[:lt] = first
+    segment[lt:gt] = middle
+    segment[gt:] = last
+
+    if lt > 1:
+      stack.append((a, a + lt - 1, depth - 1))
+    if n - gt > 1:
+      stack.append((a + gt, b, depth - 1))
+
+def parallel_quick_sort(
+  S: List[int],
+  a: int,
+  b: int,
+  processes: int | None = None,
+  threshold: int = PARALLEL_THRESHOLD,
+  typecode: str = 'q'
+) -> None:
+  """
+  Sorts S[a:b+1] in-place using a pool of worker processes.
+
+  The range is copied once into a shared-memory buffer of the given array
+  typecode ('q' for 64-bit integers by default). The parent process runs the
+  top partitioning levels until there are enough disjoint ranges, then the
+  workers sort those ranges directly in the shared buffer. Only the buffer
+  name and range bounds are sent to the workers, never the data itself.
+
+  Ranges shorter than threshold (or a single process) are sorted with
+  inplace_quick_sort without starting any workers.
+
+  Raises:
+    TypeError, OverflowError: If an element does not fit the typecode.
+  """
+  n = b - a + 1
+  if processes is None:
+    processes = os.cpu_count() or 1
+
+  if n < threshold or processes < 2:
+    inplace_quick_sort(S, a, b)
+    return
+
+  values = array(typecode, S[a:b + 1])
+  shm = shared_memory.SharedMemory(create=True, size=n * values.itemsize)
+  view = shm.buf.cast(typecode)
+  try:
+    view[:] = values
+    del values
+
+    ranges = _split_ranges(view, 0, n - 1, processes * PARALLEL_TASKS_PER_PROCESS)
+    tasks = [(shm.name, typecode, lo, hi) for lo, hi in ranges]
+    with Pool(processes) as pool:
+      pool.starmap(_sort_shared_range, tasks)
+
+    S[a:b + 1] = view.tolist()
+  finally:
+    view.release()
+    shm.close()
+    shm.unlink()
+
+def _split_ranges(K: List[Any], a: int, b: int, parts: int) -> list[tuple[int, int]]:
+  """
+  Partitions K[a:b+1] until it is split into at least parts disjoint ranges.
+
+  The largest range is always partitioned next. Keys equal to a pivot end
+  up in their final place and are not part of any returned range.
+  """
+  less = operator.lt
+  three_way = _has_few_distinct(K, a, b)
+  heap = [(-(b - a + 1), a, b)]
+  done = []
+
+  while heap and len(heap) + len(done) < parts:
+    _, a, b = heapq.heappop(heap)
+    if b - a < INSERTION_SORT_CUTOFF:
+      done.append((a, b))
+      continue
+
+    _select_pivot(K, None, a, b, less)
+    if three_way:
+      lt, gt = _partition_three_way(K, None, a, b, less)
+    else:
+      lt = gt = _partition(K, None, a, b, less)
+
+    for lo, hi in ((a, lt - 1), (gt + 1, b)):
+      if lo < hi:
+        heapq.heappush(heap, (-(hi - lo + 1), lo, hi))
+
+  return done + [(lo, hi) for _, lo, hi in heap]
+
+def _sort_shared_range(name: str, typecode: str, a: int, b: int) -> None:
+  """Worker task: sorts one range of the shared-memory buffer in-place."""
+  shm = shared_memory.SharedMemory(name=name)
+  view = shm.buf.cast(typecode)
+  try:
+    inplace_quick_sort(view, a, b)
+  finally:
+    view.release()
+    shm.close()
+
+def external_sort(
+  input_path: str,
+  output_path: str,
+  typecode: str | None = None,
+  memory_limit: int = EXTERNAL_MEMORY_LIMIT,
+  fan_in: int = EXTERNAL_FAN_IN,
+  tmp_dir: str | None = None
+) -> None:
+  """
+  Sorts a file that may be larger than memory and writes the result.
+
+  With typecode=None the input is treated as newline-delimited records
+  compared as bytes; otherwise it is a packed binary array of that
+  array.array typecode (for example 'q' or 'd'). See iter_external_sort for
+  the meaning of memory_limit and fan_in. The output is written to a
+  temporary file that replaces output_path once it is complete, so the
+  input file itself may be the output.
+  """
+  records = iter_external_sort(input_path, typecode, memory_limit, fan_in, tmp_dir)
+  directory = os.path.dirname(os.path.abspath(output_path))
+  fd, partial_path = tempfile.mkstemp(dir=directory, suffix='.partial')
+  try:
+    with os.fdopen(fd, 'wb') as output:
+      _write_run(output, records, typecode, memory_limit)
+    os.replace(partial_path, output_path)
+  except BaseException:
+    os.remove(partial_path)
+    raise
+
+def iter_external_sort(
+  input_path: str,
+  typecode: str | None = None,
+  memory_limit: int = EXTERNAL_MEMORY_LIMIT,
+  fan_in: int = EXTERNAL_FAN_IN,
+  tmp_dir: str | None = None
+) -> Iterator[Any]:
+  """
+  Yields the records of input_path in sorted order.
+
+  The input is read in chunks of about memory_limit bytes. Each chunk is
+  sorted with inplace_quick_sort and written to a temporary run file. The
+  runs are then memory-mapped and combined with a heap-based k-way merge
+  that reads at most fan_in runs at once (extra merge passes are made if
+  there are more runs). Records are yielded while the final merge is in
+  progress; the temporary files are removed once the generator finishes
+  or is closed.
+
+  Yields:
+    bytes lines (each ending in b'\n') when typecode is None, otherwise
+    the numbers stored in the binary file.
+
+  Raises:
+    ValueError: If fan_in < 2, or a binary input is not a whole number of
+      items.
+  """
+  if fan_in < 2:
+    raise ValueError('fan_in must be at least 2.')
+
+  with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+    runs = []
+    with open(input_path, 'rb') as source:
+      for chunk in _read_chunks(source, typecode, memory_limit):
+        inplace_quick_sort(chunk, 0, len(chunk) - 1)
+        runs.append(os.path.join(directory, f'run-{len(runs)}'))
+        with open(runs[-1], 'wb') as run:
+          _write_run(run, chunk, typecode, memory_limit)
+
+    # Intermediate passes until a single merge can read every run
+    passes = 0
+    while len(runs) > fan_in:
+      merged = []
+      for i in range(0, len(runs), fan_in):
+        merged.append(os.path.join(directory, f'pass-{passes}-{len(merged)}'))
+        with open(merged[-1], 'wb') as run:
+          _write_run(run, _merge_run_files(runs[i:i + fan_in], typecode), typecode, memory_limit)
+        for path in runs[i:i + fan_in]:
+          os.remove(path)
+      runs = merged
+      passes += 1
+
+    yield from _merge_run_files(runs, typecode)
+
+def merge_sorted_runs(runs: Iterable[Iterable[Any]]) -> Iterator[Any]:
+  """
+  Lazily merges already sorted iterables with a min-heap of their heads.
+
+  Each step yields the smallest head and replaces it with the next item of
+  the same run, so k runs of total length n are merged in O(n log k).
+  """
+  iterators = [iter(run) for run in runs]
+  heap = []
+  for i, iterator in enumerate(iterators):
+    for head in iterator:
+      heap.append((head, i))
+      break
+  heapq.heapify(heap)
+
+  while heap:
+    head, i = heap[0]
+    yield head
+    for head in iterators[i]:
+      heapq.heapreplace(heap, (head, i))
+      break
+    else:
+      heapq.heappop(heap)
+
+def _read_chunks(source: BinaryIO, typecode: str | None, memory_limit: int) -> Iterator[Any]:
+  """Yields the input as a list of lines or an array of roughly memory_limit bytes."""
+  if typecode is None:
+    while True:
+      lines = source.readlines(memory_limit)
+      if not lines:
+        return
+      if not lines[-1].endswith(b'\n'):
+        lines[-1] += b'\n'
+      yield lines
+
+  itemsize = array(typecode).itemsize
+  chunk_bytes = max(1, memory_limit // itemsize) * itemsize
+  while True:
+    data = source.read(chunk_bytes)
+    if not data:
+      return
+    if len(data) % itemsize:
+      raise ValueError(f'Input size is not a multiple of the item size ({itemsize}).')
+    yield array(typecode, data)
+
+def _write_run(output: BinaryIO, records: Iterable[Any], typecode: str | None, memory_limit: int) -> None:
+  """Writes sorted records to output, buffering binary items in arrays."""
+  if typecode is None:
+    output.writelines(records)
+    return
+
+  if isinstance(records, array):
+    records.tofile(output)
+    return
+
+  buffer = array(typecode)
+  batch = max(1, memory_limit // buffer.itemsize)
+  for record in records:
+    buffer.append(record)
+    if len(buffer) >= batch:
+      buffer.tofile(output)
+      buffer = array(typecode)
+  buffer.tofile(output)
+
+def _merge_run_files(paths: list[str], typecode: str | None) -> Iterator[Any]:
+  """Merges the given run files, reading each one through mmap."""
+  return merge_sorted_runs(_iter_run_file(path, typecode) for path in paths)
+
+def _iter_run_file(path: str, typecode: str | None) -> Iterator[Any]:
+  """Yields the records of one memory-mapped run file."""
+  with open(path, 'rb') as run:
+    if os.fstat(run.fileno()).st_size == 0:
+      return
+    with mmap.mmap(run.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+      if typecode is None:
+        yield from iter(mapped.readline, b'')
+        return
+
+      view = memoryview(mapped).cast(typecode)
+      try:
+        yield from view
+      finally:
+        view.release()
+
+def benchmark_parallel(n: int = 10_000_000, processes: int | None = None) -> None:
+  """Compares inplace_quick_sort and parallel_quick_sort on n random integers."""
+  data = [ random.randint(0, 2 ** 62) for _ in range(n) ]
+
+  sequential = data[:]
+  start = time.perf_counter()
+  inplace_quick_sort(sequential, 0, n - 1)
+  sequential_time = time.perf_counter() - start
+
+  parallel = data[:]
+  start = time.perf_counter()
+  parallel_quick_sort(parallel, 0, n - 1, processes)
+  parallel_time = time.perf_counter() - start
 
-    while left <= right:
-      while left <= right and S[left] < pivot:
-        left += 1
-      while left <= right and pivot < S[right]:
-        right -= 1
-      if left <= right:
-        S[left], S[right] = S[right], S[left]
-        left, right = left + 1, right - 1
+  assert parallel == sequential
+  print(f'n = {n}, processes = {processes or os.cpu_count()}')
+  print(f'inplace_quick_sort:  {sequential_time:.2f} s')
+  print(f'parallel_quick_sort: {parallel_time:.2f} s')
+  print(f'speedup: {sequential_time / parallel_time:.2f}x')
 
-    S[left], S[b] = S[b], S[left]
+if __name__ == '__main__':
+  if '--benchmark' in sys.argv[1:]:
+    benchmark_parallel()
+  else:
+    input_list = [ random.randint(1, 100) for _ in range(40) ]
+    input_list_length = len(input_list)
 
-    stack.append((a, left - 1))
-    stack.append((left + 1, b))
+    print(f'Random list: {input_list}')
+    inplace_quick_sort(input_list, 0, input_list_length - 1)
+    print(f'Sorted list: {input_list}')
 
-input_list = [ random.randint(1, 100) for _ in range(40) ]
-input_list_length = len(input_list)
+    records = [ (f'item-{i}', random.randint(1, 10)) for i in range(8) ]
+    inplace_quick_sort(records, 0, len(records) - 1, key=lambda r: r[1], reverse=True)
+    print(f'Records by count, descending: {records}')
 
-print(f'Random list: {input_list}')
-inplace_quick_sort(input_list, 0, input_list_length - 1)
-print(f'Sorted list: {input_list}')
\ No newline at end of file
+    values = [ random.randint(1, 1000) for _ in range(20) ]
+    print(f'Values: {values}')
+    print(f'Top 3: {top_k(values, 3)}')
+    print(f'Median: {select(values, len(values) // 2)}')
+    print(f'Quartiles: {quantiles(values, [0.25, 0.5, 0.75])}')
@@ -1,41 +1,93 @@
 # [P-2.33] Write a Python program that inputs a polynomial in standard algebraic
 # notation and outputs the first derivative of that polynomial.
 
-from typing import Self
+from typing import Iterator, Self, TextIO
+import io
 import re
 
 class Polynomial:
   """
   Represents a polynomial and provides methods for differentiation and string formatting.
+
+  Polynomials parsed from strings (or given as a dict) are stored densely, as a
+  list indexed by exponent, unless fewer than SPARSE_DENSITY of the exponents up
+  to the degree have a non-zero coefficient. Such sparse polynomials (for example
+  "x^10000000 + 1") keep sorted lists of the exponents and coefficients of their
+  non-zero terms instead, so their size and the cost of differentiation and
+  formatting depend on the number of terms, not the degree.
   """
-  
-  def __init__(self, polynomial_input: str | list[int | float]) -> None:
+
+  SPARSE_DENSITY = 0.1
+  SPARSE_MIN_DEGREE = 64
+
+  # Pattern explanation:
+  # [+-]?                : optional sign
+  # (?:\d*\.?\d*)        : coefficient (optional, can be float)
+  # x                    : literal 'x'
+  # (?:\^(\d+))?         : optional exponent
+  # |                    : OR
+  # [+-]?\d+\.?\d* : constant term (with optional decimal)
+  _TERM_PATTERN = re.compile(r'([+-]?(?:\d*\.?\d*))x(?:\^(\d+))?|([+-]?\d+\.?\d*)')
+
+  def __init__(self, polynomial_input: str | list[int | float] | dict[int, int | float]) -> None:
     """
     Initialize the Polynomial object.
 
     Args:
       polynomial_input: Either a string representing the polynomial 
-                        (example: "x^2 + 2x + 4") or a list of coefficients 
+                        (example: "x^2 + 2x + 4"), a list of coefficients 
                         where the index corresponds to the exponent 
-                        (example: [4, 2, 1] for x^2 + 2x + 4).
+                        (example: [4, 2, 1] for x^2 + 2x + 4), or a dict
+                        mapping exponents to coefficients
+                        (example: {2: 1, 1: 2, 0: 4}).
     
     Raises:
       ValueError: If the string format is invalid.
-      TypeError: If the input is neither a string nor a list.
+      TypeError: If the input is not a string, a list or a dict.
     """
+    self._exponents = None
+    self._coefficients = None
+
     if isinstance(polynomial_input, list):
       self._polynomial_list = polynomial_input
+    elif isinstance(polynomial_input, dict):
+      self._set_terms(polynomial_input)
     elif isinstance(polynomial_input, str):
       try:
-        self._polynomial_list = self._convert_polynomial_str_to_list(polynomial_input)
+        self._set_terms(self._convert_polynomial_str_to_terms(polynomial_input))
       except Exception as e:
-        raise ValueError(f"Invalid polynomial string: {polynomial_input}") from e
+        raise ValueError(f"Invalid polynomial string: {e}") from e
+    else:
+      raise TypeError("Polynomial must be initialized with a string, a list or a dict of numbers.")
+
+  @classmethod
+  def _from_sparse_terms(cls, exponents: list[int], coefficients: list[int | float]) -> Self:
+    """Creates a sparse polynomial from sorted exponents and their non-zero coefficients."""
+    polynomial = cls.__new__(cls)
+    polynomial._polynomial_list = None
+    polynomial._exponents = exponents
+    polynomial._coefficients = coefficients
+    return polynomial
+
+  def _set_terms(self, terms: dict[int, int | float]) -> None:
+    """
+    Stores a dict of exponent -> coefficient in the dense or the sparse
+    representation, depending on how many exponents up to the degree have
+    a non-zero coefficient.
+    """
+    exponents = sorted(exp for exp, coeff in terms.items() if coeff != 0)
+    degree = exponents[-1] if exponents else 0
+
+    if degree >= self.SPARSE_MIN_DEGREE and len(exponents) < self.SPARSE_DENSITY * (degree + 1):
+      self._polynomial_list = None
+      self._exponents = exponents
+      self._coefficients = [terms[exp] for exp in exponents]
     else:
-      raise TypeError("Polynomial must be initialized with a string or a list of numbers.")
+      self._polynomial_list = self._coefficients_to_list({exp: terms[exp] for exp in exponents})
 
-  def _convert_polynomial_str_to_list(self, polynomial_str: str) -> list[int | float]:
+  def _convert_polynomial_str_to_terms(self, polynomial_str: str) -> dict[int, float]:
     """
-    Parses a string representation of a polynomial into a list of coefficients.
+    Parses a string representation of a polynomial into a dict of coefficients.
 
     This method uses regular expressions to tokenize the input string, 
     identifying coefficients and exponents for each term.
@@ -44,54 +96,175 @@ class Polynomial:
       polynomial_str: The algebraic string to parse.
 
     Returns:
-      A list of floats/ints where index i holds the coefficient for x^i.
+      A dict mapping each exponent i to the coefficient of x^i.
+
+    Raises:
+      ValueError: If the string contains an invalid term.
     """
-    polynomial_str = polynomial_str.replace(" ", "")
+    compact_str = "".join(polynomial_str.split())
 
-    if not polynomial_str or polynomial_str == "0":
-      return [0]
+    if not compact_str or compact_str == "0":
+      return {}
 
     coefficients = {}
+    self._scan_terms(polynomial_str, compact_str, 0, coefficients)
+    return coefficients
 
-    # Parse terms - find all matches
-    # Pattern explanation:
-    # [+-]?                : optional sign
-    # (?:\d*\.?\d*)        : coefficient (optional, can be float)
-    # x                    : literal 'x'
-    # (?:\^(\d+))?         : optional exponent
-    # |                    : OR
-    # [+-]?\d+\.?\d* : constant term (with optional decimal)
-    pattern = r'([+-]?(?:\d*\.?\d*))x(?:\^(\d+))?|([+-]?\d+\.?\d*)'
-    position = 0
+  @classmethod
+  def from_file(cls, file: TextIO, chunk_size: int = 1 << 16) -> Self:
+    """
+    Parses a polynomial from a text file object, reading it in chunks.
 
-    while position < len(polynomial_str):
-      match = re.match(pattern, polynomial_str[position:])
-      if not match:
-        raise ValueError(f"Invalid polynomial format at position {position}")
+    Each chunk is scanned up to its last '+' or '-' sign, since a term can
+    only start (never continue) at a sign; the rest is carried over to the
+    next chunk, so terms split between chunks are parsed correctly.
 
-      full_match = match.group(0)
+    Args:
+      file: The file object to read from.
+      chunk_size: Number of characters to read at a time.
 
-      if 'x' in full_match:
-        coeff_str = match.group(1) or ''
-        exp_str = match.group(2)
+    Raises:
+      ValueError: If the file contains an invalid term.
+    """
+    coefficients = {}
+    pending = ""
+    offset = 0
+
+    while True:
+      chunk = file.read(chunk_size)
+      pending += chunk
+      if chunk:
+        cut = max(pending.rfind("+"), pending.rfind("-"))
+        if cut <= 0:
+          continue
+      else:
+        cut = len(pending)
+
+      text = pending[:cut]
+      try:
+        cls._scan_terms(text, "".join(text.split()), offset, coefficients, pending[cut:cut + 1])
+      except ValueError as e:
+        raise ValueError(f"Invalid polynomial string: {e}") from e
+      offset += cut
+      pending = pending[cut:]
+
+      if not chunk:
+        break
+
+    return cls(coefficients)
+
+  @classmethod
+  def _scan_terms(
+    cls,
+    text: str,
+    compact_str: str,
+    offset: int,
+    coefficients: dict[int, float],
+    following: str = ''
+  ) -> None:
+    """
+    Adds the terms of text to coefficients (exponent -> coefficient).
 
+    The precompiled pattern is matched at increasing positions of the
+    whitespace-free compact_str, without slicing, so scanning is linear in
+    the length of the text.
+
+    Args:
+      text: The original text, used to report error positions.
+      compact_str: text with all whitespace removed.
+      offset: Position of text in the whole input.
+      following: The character right after text ('' at the end of the input).
+
+    Raises:
+      ValueError: If a term is invalid, with the position of the first
+        character that cannot continue it.
+    """
+    match_term = cls._TERM_PATTERN.match
+    position = 0
+    term_start = 0
+
+    while position < len(compact_str):
+      match = match_term(compact_str, position)
+      if not match:
+        # The previous term may have stopped early, e.g. at the '^' of "3x^a"
+        start = term_start
+        bad = cls._first_invalid_position(compact_str, start)
+        if bad <= position:
+          start = position
+          bad = cls._first_invalid_position(compact_str, start)
+        if bad == len(compact_str):
+          if following:
+            raise ValueError(f"unexpected {following!r} at position {offset + len(text)}")
+          raise ValueError(
+            f"incomplete term at position {offset + cls._original_position(text, start)}"
+          )
+        raise ValueError(
+          f"unexpected {compact_str[bad]!r} at position {offset + cls._original_position(text, bad)}"
+        )
+
+      coeff_str, exp_str, constant_str = match.groups()
+
+      if constant_str is None:
         if not coeff_str or coeff_str == '+':
           coeff = 1.0
         elif coeff_str == '-':
           coeff = -1.0
         else:
-          coeff = float(coeff_str)
+          try:
+            coeff = float(coeff_str)
+          except ValueError:
+            raise ValueError(
+              f"invalid coefficient {coeff_str!r} at position {offset + cls._original_position(text, position)}"
+            ) from None
 
         exp = int(exp_str) if exp_str else 1
 
       else:
-        coeff = float(match.group(3))
+        coeff = float(constant_str)
         exp = 0
 
       coefficients[exp] = coefficients.get(exp, 0) + coeff
 
-      position += len(full_match)
+      term_start = position
+      position = match.end()
 
+  @staticmethod
+  def _first_invalid_position(compact_str: str, position: int) -> int:
+    """
+    Returns the position of the first character that cannot continue the
+    term starting at position (len(compact_str) if the term is cut short).
+    """
+    i = position
+    if i < len(compact_str) and compact_str[i] in '+-':
+      i += 1
+    while i < len(compact_str) and compact_str[i].isdigit():
+      i += 1
+    if i < len(compact_str) and compact_str[i] == '.':
+      i += 1
+    while i < len(compact_str) and compact_str[i].isdigit():
+      i += 1
+    if i < len(compact_str) and compact_str[i] == 'x':
+      i += 1
+      if i < len(compact_str) and compact_str[i] == '^':
+        i += 1
+        while i < len(compact_str) and compact_str[i].isdigit():
+          i += 1
+    return i
+
+  @staticmethod
+  def _original_position(text: str, compact_position: int) -> int:
+    """Maps a position in the whitespace-free text back to the position in text."""
+    seen = 0
+    for i, char in enumerate(text):
+      if not char.isspace():
+        if seen == compact_position:
+          return i
+        seen += 1
+    return len(text)
+
+  @staticmethod
+  def _coefficients_to_list(coefficients: dict[int, float]) -> list[int | float]:
+    """Converts a dict of exponent -> coefficient into a dense coefficient list."""
     if not coefficients:
       return [0]
 
@@ -109,7 +282,30 @@ class Polynomial:
     
     The degree is defined as the highest exponent of x with a non-zero coefficient.
     """
-    return len(self._polynomial_list) - 1
+    if self.is_sparse():
+      return self._exponents[-1] if self._exponents else 0
+
+    degree = len(self._polynomial_list) - 1
+    while degree > 0 and self._polynomial_list[degree] == 0:
+      degree -= 1
+    return degree
+
+  def is_sparse(self) -> bool:
+    """Returns True if only the non-zero terms are stored."""
+    return self._polynomial_list is None
+
+  def to_dense(self) -> Self:
+    """Returns a copy of the polynomial stored as a coefficient list."""
+    if not self.is_sparse():
+      return Polynomial(list(self._polynomial_list))
+    return Polynomial(self._coefficients_to_list(dict(zip(self._exponents, self._coefficients))))
+
+  def to_sparse(self) -> Self:
+    """Returns a copy of the polynomial that stores only its non-zero terms."""
+    if self.is_sparse():
+      return Polynomial._from_sparse_terms(list(self._exponents), list(self._coefficients))
+    exponents = [exp for exp, coeff in enumerate(self._polynomial_list) if coeff != 0]
+    return Polynomial._from_sparse_terms(exponents, [self._polynomial_list[exp] for exp in exponents])
 
   def calculate_derivative(self) -> Self:
     """
@@ -118,6 +314,13 @@ class Polynomial:
     Returns:
       A new Polynomial instance representing the first derivative.
     """
+    if self.is_sparse():
+      start = 1 if self._exponents and self._exponents[0] == 0 else 0
+      return Polynomial._from_sparse_terms(
+        [exp - 1 for exp in self._exponents[start:]],
+        [coeff * exp for exp, coeff in zip(self._exponents[start:], self._coefficients[start:])]
+      )
+
     if len(self._polynomial_list) <= 1:
       return Polynomial([0])
 
@@ -132,16 +335,9 @@ class Polynomial:
     """
     Returns the string representation of the polynomial in standard algebraic form.
     """
-    if not self._polynomial_list or all(coeff == 0 for coeff in self._polynomial_list):
-      return "0"
-
     terms = []
 
-    for degree in range(len(self._polynomial_list) - 1, -1, -1):
-      coeff = self._polynomial_list[degree]
-      if coeff == 0:
-        continue
-
+    for degree, coeff in self._nonzero_terms():
       sign = "-" if coeff < 0 else "+"
       abs_coeff = abs(coeff)
 
@@ -158,12 +354,21 @@ class Polynomial:
       return "0"
 
     first_sign, first_term = terms[0]
-    result = f"-{first_term}" if first_sign == "-" else first_term
+    parts = [f"-{first_term}" if first_sign == "-" else first_term]
+    parts.extend(f"{sign} {term}" for sign, term in terms[1:])
 
-    for sign, term in terms[1:]:
-      result += f" {sign} {term}"
+    return " ".join(parts)
 
-    return result
+  def _nonzero_terms(self) -> Iterator[tuple[int, int | float]]:
+    """Yields (exponent, coefficient) for every non-zero term, highest exponent first."""
+    if self.is_sparse():
+      yield from zip(reversed(self._exponents), reversed(self._coefficients))
+      return
+
+    for degree in range(len(self._polynomial_list) - 1, -1, -1):
+      coeff = self._polynomial_list[degree]
+      if coeff != 0:
+        yield degree, coeff
 
 
 test_cases = [
@@ -188,7 +393,22 @@ for test_str in test_cases:
   except Exception as e:
     print(f"Exception: {e}")
   print()
-  
+
+print("Streaming parser")
+stream = io.StringIO("3x^2 - 2x + 4 - x^3 + 0.5x^2\n")
+polynomial = Polynomial.from_file(stream, chunk_size=4)
+print(f"f(x) = {polynomial}")
+print(f"f'(x) = {polynomial.calculate_derivative()}")
+print()
+
+print("Sparse representation")
+polynomial = Polynomial("x^10000000 + 3x^2 - 1")
+print(f"f(x) = {polynomial}")
+print(f"is_sparse: {polynomial.is_sparse()}, degree: {polynomial.degree()}")
+print(f"f'(x) = {polynomial.calculate_derivative()}")
+print(f"dense f(x) = {Polynomial('x^100 + 1').to_dense()}")
+print()
+
 polynomial_str = input(f'polynomial_str: ')
 try:
   polynomial = Polynomial(polynomial_str)
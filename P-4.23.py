@@ -2,7 +2,20 @@
 # reports all entries of the file system rooted at the given path having the
 # given file name.
 
+import fnmatch
+import mmap
 import os
+import pickle
+import queue
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, Self
 
 def find(path: str, filename: str) -> list[str]:
   """
@@ -39,13 +52,565 @@ def find(path: str, filename: str) -> list[str]:
       
   return files_list
 
-path = input('path: ')
-filename = input('filename: ')
+def iter_find(path: str, filename: str) -> Iterator[str]:
+  """
+  Lazily yields the paths of all files named 'filename' below 'path'.
+
+  Visits entries in the same depth-first order as find, but uses
+  os.scandir, whose DirEntry objects carry the file type reported by the
+  directory listing, so no extra stat call is needed per entry in the
+  common case. An explicit stack replaces recursion, so deep trees cannot
+  hit the recursion limit, and matches are yielded as soon as they are
+  found instead of being collected into a list.
+
+  Args:
+    path: The starting directory path (string).
+    filename: The exact name of the file to search for (string).
+
+  Yields:
+    Paths to matching files. Directories that do not exist or cannot be
+    read are skipped.
+  """
+  # Each stack entry holds the not yet visited entries of one directory,
+  # reversed so that pop() returns them in listing order
+  stack = [_scan(path)]
+
+  while stack:
+    entries = stack[-1]
+    if not entries:
+      stack.pop()
+      continue
+
+    entry = entries.pop()
+    if entry.is_dir():
+      stack.append(_scan(entry.path))
+    elif entry.name == filename and entry.is_file():
+      yield entry.path
+
+def _scan(path: str) -> list[os.DirEntry]:
+  """Returns the entries of directory 'path' in reverse listing order."""
+  try:
+    with os.scandir(path) as iterator:
+      entries = list(iterator)
+  except (FileNotFoundError, PermissionError):
+    # Handle cases where path doesn't exist or permission is restricted
+    return []
+  entries.reverse()
+  return entries
+
+def find_many(
+  path: str,
+  names: Iterable[str] = (),
+  globs: Iterable[str] = (),
+  patterns: Iterable[str | re.Pattern] = (),
+  *,
+  max_results: int | None = None,
+  first_match: bool = False,
+  exclude: Iterable[str] = (),
+  max_depth: int | None = None
+) -> dict[str | re.Pattern, list[str]]:
+  """
+  Answers many file name queries with a single traversal of the tree.
+
+  Literal names are looked up in a hash set. Globs (fnmatch syntax) and
+  regular expressions are combined into one regex that rejects most names
+  in a single match call; only names it accepts are tested against the
+  individual patterns to find out which queries they satisfy. Globs and
+  regexes must match the whole file name.
+
+  Args:
+    path: The starting directory path (string).
+    names: Exact file names to search for.
+    globs: Shell-style patterns such as '*.py'.
+    patterns: Regular expressions, as strings or compiled patterns.
+    max_results: Stop the walk once this many paths have been reported.
+    first_match: Report at most one path per query and stop the walk once
+      every query has been answered.
+    exclude: Globs for entry names to skip; a matching directory is not
+      entered, so its whole subtree is pruned (e.g. '.git', 'node_modules').
+    max_depth: Do not descend more than this many levels below path
+      (0 only looks at the files directly in path).
+
+  Returns:
+    A dictionary mapping every query to the list of matching paths, in the
+    same depth-first order as find. Identical query strings share an entry.
+  """
+  literals = set(names)
+  matchers = [(glob, re.compile(fnmatch.translate(glob))) for glob in globs]
+  matchers += [(pattern, re.compile(pattern)) for pattern in patterns]
+  results = {query: [] for query in literals}
+  results.update((query, []) for query, _ in matchers)
+
+  prefilter = _combine_patterns([regex for _, regex in matchers])
+  excluded = _combine_patterns([re.compile(fnmatch.translate(glob)) for glob in exclude])
+  pending = len(results)
+  reported = 0
+
+  stack = [(_scan(path), 0)]
+  while stack and pending and reported != max_results:
+    entries, depth = stack[-1]
+    if not entries:
+      stack.pop()
+      continue
+
+    entry = entries.pop()
+    name = entry.name
+    if excluded is not None and excluded.fullmatch(name):
+      continue
+
+    if entry.is_dir():
+      if max_depth is None or depth < max_depth:
+        stack.append((_scan(entry.path), depth + 1))
+      continue
+
+    queries = [name] if name in literals else []
+    if prefilter is not None and prefilter.fullmatch(name):
+      queries.extend(query for query, regex in matchers if regex.fullmatch(name))
+    if not queries or not entry.is_file():
+      continue
+
+    for query in dict.fromkeys(queries):
+      found = results[query]
+      if first_match and found:
+        continue
+      found.append(entry.path)
+      reported += 1
+      if first_match:
+        pending -= 1
+      if reported == max_results:
+        break
+
+  return results
+
+def _combine_patterns(regexes: list[re.Pattern]) -> re.Pattern | None:
+  """
+  Returns one regex that fully matches whatever any of the regexes fully
+  matches, or None if there are no regexes. If the patterns cannot be
+  combined (different flags, global inline flags, or capture groups, which
+  the alternation would renumber and so break backreferences), a regex
+  accepting everything is returned, so every name is tested individually.
+  """
+  if not regexes:
+    return None
+
+  flags = {regex.flags for regex in regexes}
+  if len(flags) == 1 and not any(regex.groups for regex in regexes):
+    try:
+      return re.compile('|'.join(f'(?:{regex.pattern})' for regex in regexes), flags.pop())
+    except (re.error, TypeError):
+      pass
+  return re.compile('.*', re.DOTALL)
+
+def find_concurrent(
+  path: str,
+  filename: str,
+  max_workers: int | None = None,
+  ordered: bool = True
+) -> list[str]:
+  """
+  Returns the same matches as find, listing directories in parallel.
+
+  See iter_find_concurrent for the meaning of max_workers and ordered.
+  """
+  return list(iter_find_concurrent(path, filename, max_workers, ordered))
+
+def iter_find_concurrent(
+  path: str,
+  filename: str,
+  max_workers: int | None = None,
+  ordered: bool = True
+) -> Iterator[str]:
+  """
+  Yields the paths of files named 'filename' below 'path', listing up to
+  max_workers directories at the same time.
+
+  Every directory listing is a task on the work queue of a shared thread
+  pool, and the subdirectories of a listing are queued as soon as it
+  finishes. This pays off when each listing is latency-bound (network
+  shares, cold caches), because the waits overlap.
+
+  With ordered=True matches are yielded in exactly the same order as find
+  and iter_find: listings still run ahead in parallel, but their results are
+  consumed depth-first. With ordered=False matches are yielded as soon as
+  their directory has been listed, in no particular order.
+
+  Args:
+    path: The starting directory path (string).
+    filename: The exact name of the file to search for (string).
+    max_workers: Number of listing threads (ThreadPoolExecutor default if None).
+    ordered: Whether to preserve the depth-first order of find.
+
+  Yields:
+    Paths to matching files. Directories that do not exist or cannot be
+    read are skipped, as in find.
+  """
+  stop = threading.Event()
+  with ThreadPoolExecutor(max_workers) as pool:
+    try:
+      if ordered:
+        yield from _consume_ordered(pool, path, filename, stop)
+      else:
+        yield from _consume_unordered(pool, path, filename, stop)
+    finally:
+      # Stop queueing new listings if the caller abandons the generator
+      stop.set()
+      pool.shutdown(cancel_futures=True)
+
+def _consume_ordered(
+  pool: ThreadPoolExecutor,
+  path: str,
+  filename: str,
+  stop: threading.Event
+) -> Iterator[str]:
+  """Walks the listings produced by _list_tree in depth-first order."""
+  stack = [[pool.submit(_list_tree, pool, path, filename, stop)]]
+
+  while stack:
+    items = stack[-1]
+    if not items:
+      stack.pop()
+      continue
+
+    item = items.pop()
+    if isinstance(item, Future):
+      stack.append(item.result())
+    else:
+      yield item
+
+def _list_tree(
+  pool: ThreadPoolExecutor,
+  path: str,
+  filename: str,
+  stop: threading.Event
+) -> list[str | Future]:
+  """
+  Lists one directory and immediately queues listings of its subdirectories.
+
+  Returns matching file paths and the futures of subdirectory listings in
+  reverse listing order, ready to be popped by _consume_ordered.
+  """
+  items = []
+  for entry in _scan(path):
+    if entry.is_dir():
+      if stop.is_set():
+        return []
+      items.append(pool.submit(_list_tree, pool, entry.path, filename, stop))
+    elif entry.name == filename and entry.is_file():
+      items.append(entry.path)
+  return items
+
+def _consume_unordered(
+  pool: ThreadPoolExecutor,
+  path: str,
+  filename: str,
+  stop: threading.Event
+) -> Iterator[str]:
+  """Yields matches from whichever directory listing finishes first."""
+  results = queue.Queue()
+  pool.submit(_list_into_queue, pool, path, filename, stop, results)
+  outstanding = 1
+
+  while outstanding:
+    result = results.get()
+    if isinstance(result, BaseException):
+      raise result
+    subdirectories, matches = result
+    outstanding += subdirectories - 1
+    yield from matches
+
+def _list_into_queue(
+  pool: ThreadPoolExecutor,
+  path: str,
+  filename: str,
+  stop: threading.Event,
+  results: queue.Queue
+) -> None:
+  """
+  Lists one directory, queues listings of its subdirectories and reports
+  (number of subdirectories queued, matches) to _consume_unordered.
+  """
+  try:
+    directories, matches = _list_directory(path, filename)
+  except BaseException as e:
+    results.put(e)
+    return
+
+  if stop.is_set():
+    directories = []
+
+  # Report before queueing, so the consumer counts the subdirectories
+  # before any of their own reports can arrive
+  results.put((len(directories), matches))
+  for directory in directories:
+    pool.submit(_list_into_queue, pool, directory, filename, stop, results)
+
+def _list_directory(path: str, filename: str) -> tuple[list[str], list[str]]:
+  """Returns the subdirectories of 'path' and the matching files in it."""
+  directories = []
+  matches = []
+  for entry in _scan(path):
+    if entry.is_dir():
+      directories.append(entry.path)
+    elif entry.name == filename and entry.is_file():
+      matches.append(entry.path)
+  return directories, matches
+
+class FileIndex:
+  """
+  Persistent basename -> paths index of one directory tree, similar to locate.
+
+  The index is stored in two files:
+    - index_path: the lookup table, with (basename, path) records sorted by
+      basename and a table of record offsets. It is memory-mapped on the
+      first query, so opening even a very large index is nearly free, and a
+      query is a binary search costing O(log n + matches).
+    - index_path + '.dirs': the modification time and the file and
+      subdirectory names of every directory. It is only loaded by refresh.
+
+  Offsets are stored in the native byte order of the machine that built
+  the index.
+  """
+
+  MAGIC = b'FINDIDX1'
+  _HEADER = struct.Struct('8sQ')
+
+  def __init__(self, index_path: str) -> None:
+    """Opens an existing index lazily; nothing is read until it is used."""
+    self._index_path = index_path
+    self._mapped = None
+    self._offsets = None
+    self._count = 0
+
+  @classmethod
+  def build(cls, root: str, index_path: str) -> Self:
+    """Walks the whole tree below root and writes a new index."""
+    index = cls(index_path)
+    directories, _ = _snapshot_tree(root, {})
+    index._save(root, directories)
+    return index
+
+  def refresh(self) -> int:
+    """
+    Brings the index up to date with the file system.
+
+    Every directory is stat-ed, but only directories whose modification
+    time changed since the last build are listed again; the others reuse
+    their stored entries.
+
+    Returns:
+      The number of directories that were listed again.
+    """
+    with open(self._index_path + '.dirs', 'rb') as state_file:
+      state = pickle.load(state_file)
+
+    directories, rescanned = _snapshot_tree(state['root'], state['directories'])
+    self.close()
+    self._save(state['root'], directories)
+    return rescanned
+
+  def find(self, filename: str) -> list[str]:
+    """Returns the indexed paths of all files named filename, in sorted order."""
+    self._open()
+    target = os.fsencode(filename)
+
+    low, high = 0, self._count
+    while low < high:
+      middle = (low + high) // 2
+      if self._record(middle)[0] < target:
+        low = middle + 1
+      else:
+        high = middle
+
+    results = []
+    for i in range(low, self._count):
+      name, path = self._record(i)
+      if name != target:
+        break
+      results.append(os.fsdecode(path))
+    return results
+
+  def close(self) -> None:
+    """Unmaps the lookup table; it is mapped again on the next query."""
+    if self._mapped is not None:
+      self._offsets.release()
+      self._mapped.close()
+      self._mapped = self._offsets = None
+
+  def __enter__(self) -> Self:
+    return self
+
+  def __exit__(self, *exc_info: Any) -> None:
+    self.close()
+
+  def __len__(self) -> int:
+    """Returns the number of indexed files."""
+    self._open()
+    return self._count
+
+  def _open(self) -> None:
+    """Memory-maps the lookup table if it is not mapped yet."""
+    if self._mapped is not None:
+      return
+
+    with open(self._index_path, 'rb') as table:
+      self._mapped = mmap.mmap(table.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, count = FileIndex._HEADER.unpack_from(self._mapped)
+    if magic != FileIndex.MAGIC:
+      self._mapped.close()
+      self._mapped = None
+      raise ValueError(f'{self._index_path} is not a file index.')
+
+    start = FileIndex._HEADER.size
+    self._count = count
+    self._offsets = memoryview(self._mapped)[start:start + 8 * count].cast('Q')
+
+  def _record(self, i: int) -> tuple[bytes, bytes]:
+    """Returns the (basename, path) record i of the lookup table."""
+    start = self._offsets[i]
+    name_end = self._mapped.find(b'\0', start)
+    path_end = self._mapped.find(b'\0', name_end + 1)
+    return self._mapped[start:name_end], self._mapped[name_end + 1:path_end]
+
+  def _save(self, root: str, directories: dict[str, tuple[int, list[str], list[str]]]) -> None:
+    """Writes the directory state and the lookup table, replacing old files."""
+    records = []
+    for directory, (_, files, _) in directories.items():
+      for name in files:
+        records.append((os.fsencode(name), os.fsencode(os.path.join(directory, name))))
+    records.sort()
+
+    offsets = array('Q')
+    position = FileIndex._HEADER.size + offsets.itemsize * len(records)
+    for name, path in records:
+      offsets.append(position)
+      position += len(name) + len(path) + 2
+
+    with open(self._index_path + '.tmp', 'wb') as table:
+      table.write(FileIndex._HEADER.pack(FileIndex.MAGIC, len(records)))
+      offsets.tofile(table)
+      table.writelines(name + b'\0' + path + b'\0' for name, path in records)
+
+    with open(self._index_path + '.dirs.tmp', 'wb') as state_file:
+      pickle.dump({'root': root, 'directories': directories}, state_file, pickle.HIGHEST_PROTOCOL)
+
+    os.replace(self._index_path + '.dirs.tmp', self._index_path + '.dirs')
+    os.replace(self._index_path + '.tmp', self._index_path)
+
+def _snapshot_tree(
+  root: str,
+  previous: dict[str, tuple[int, list[str], list[str]]]
+) -> tuple[dict[str, tuple[int, list[str], list[str]]], int]:
+  """
+  Records (mtime, file names, subdirectory names) for every directory below root.
+
+  Directories whose modification time matches their entry in previous are
+  not listed again. Returns the new records and the number of directories
+  that had to be listed.
+  """
+  directories = {}
+  rescanned = 0
+  stack = [root]
+
+  while stack:
+    path = stack.pop()
+    try:
+      mtime = os.stat(path).st_mtime_ns
+    except (FileNotFoundError, PermissionError):
+      continue
+
+    record = previous.get(path)
+    if record is None or record[0] != mtime:
+      files = []
+      subdirectories = []
+      for entry in _scan(path):
+        if entry.is_dir():
+          subdirectories.append(entry.name)
+        elif entry.is_file():
+          files.append(entry.name)
+      record = (mtime, files, subdirectories)
+      rescanned += 1
+
+    directories[path] = record
+    stack.extend(os.path.join(path, name) for name in record[2])
+
+  return directories, rescanned
+
+def benchmark_find(
+  directories: int = 5000,
+  files_per_directory: int = 10,
+  latency: float = 0.002,
+  max_workers: int = 32
+) -> None:
+  """
+  Times find, iter_find and find_concurrent on a synthetic tree, first as
+  is and then with 'latency' seconds of injected delay per directory
+  listing (find itself uses os.listdir and is only timed without delay).
+  """
+  global _scan
+
+  with tempfile.TemporaryDirectory() as root:
+    _build_synthetic_tree(root, directories, files_per_directory)
+    print(f'{directories} directories, {files_per_directory} files each')
+
+    original_scan = _scan
+    for delay in (0.0, latency):
+      def delayed_scan(path: str) -> list[os.DirEntry]:
+        time.sleep(delay)
+        return original_scan(path)
+
+      _scan = delayed_scan if delay else original_scan
+      try:
+        print(f'\nlatency per listing: {delay * 1000:.1f} ms')
+        candidates = [
+          ('iter_find', lambda: list(iter_find(root, 'target.txt'))),
+          (f'find_concurrent ordered ({max_workers} workers)',
+           lambda: find_concurrent(root, 'target.txt', max_workers)),
+          (f'find_concurrent unordered ({max_workers} workers)',
+           lambda: find_concurrent(root, 'target.txt', max_workers, ordered=False))
+        ]
+        if not delay:
+          candidates.insert(0, ('find', lambda: find(root, 'target.txt')))
+
+        for name, run in candidates:
+          start = time.perf_counter()
+          matches = run()
+          print(f'{name}: {time.perf_counter() - start:.3f} s, {len(matches)} matches')
+      finally:
+        _scan = original_scan
+
+def _build_synthetic_tree(root: str, directories: int, files_per_directory: int) -> None:
+  """Creates a tree of 'directories' directories with fan-out 4 below root."""
+  queue = [root]
+  created = 0
+  head = 0
+
+  while created < directories:
+    parent = queue[head]
+    head += 1
+    for i in range(4):
+      if created == directories:
+        break
+      directory = os.path.join(parent, f'dir{i}')
+      os.mkdir(directory)
+      for j in range(files_per_directory):
+        open(os.path.join(directory, f'file{j}.txt'), 'w').close()
+      if created % 10 == 0:
+        open(os.path.join(directory, 'target.txt'), 'w').close()
+      queue.append(directory)
+      created += 1
+
+if __name__ == '__main__':
+  if '--benchmark' in sys.argv[1:]:
+    benchmark_find()
+  else:
+    path = input('path: ')
+    filename = input('filename: ')
 
-results = find(path, filename)
+    found = False
+    for file_path in iter_find(path, filename):
+      print(file_path)
+      found = True
 
-if results:
-  for file_path in results:
-    print(file_path)
-else:
-    print("No matching files found.")
\ No newline at end of file
+    if not found:
+      print("No matching files found.")
\ No newline at end of file
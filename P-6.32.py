@@ -1,23 +1,57 @@
 # [P-6.32] Give a complete ArrayDeque implementation of the double-ended queue
 # ADT as sketched in Section 6.3.2.
 
-from typing import Any
+import asyncio
+import collections
+import mmap
+import os
+import queue
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from typing import Any, Iterable, Iterator
 
 class Empty(Exception):
   pass
 
+class Full(Exception):
+  pass
+
 class ArrayDeque:
   """
   Double-ended queue implementation using a circular array for storage.
+
+  The capacity is always a power of two, so circular indices are computed
+  with a bit mask instead of a modulo. It doubles when the array is full and
+  halves when fewer than a quarter of the slots are in use, but never drops
+  below the initial (or reserved) capacity on its own. Between those two
+  thresholds the capacity stays put, so alternating adds and deletes around
+  a boundary cannot make it grow and shrink repeatedly.
   """
 
-  DEFAULT_CAPACITY = 10
+  __slots__ = ('_data', '_size', '_front', '_mask', '_min_capacity')
+
+  DEFAULT_CAPACITY = 16
+
+  # Value written into slots that no longer hold an element
+  _EMPTY_SLOT = None
 
-  def __init__(self) -> None:  
-    """Initializes an empty deque with a default capacity."""
-    self._data = [None] * ArrayDeque.DEFAULT_CAPACITY
+  def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+    """
+    Initializes an empty deque.
+
+    Args:
+      capacity: Initial capacity, rounded up to a power of two.
+    """
+    capacity = _capacity_for(capacity)
+    self._data = self._allocate(capacity)
     self._size = 0
     self._front = 0
+    self._mask = capacity - 1
+    self._min_capacity = capacity
 
   def __len__(self) -> int:
     """Returns the number of elements currently in the deque."""
@@ -47,7 +81,7 @@ class ArrayDeque:
     """
     if self.is_empty():
       raise Empty('Queue is empty')
-    back = (self._front + self._size - 1) % len(self._data)
+    back = (self._front + self._size - 1) & self._mask
     return self._data[back]
 
   def delete_first(self) -> Any:
@@ -62,9 +96,10 @@ class ArrayDeque:
     if self.is_empty():
       raise Empty('Queue is empty')
     answer = self._data[self._front]
-    self._data[self._front] = None
-    self._front = (self._front + 1) % len(self._data)
+    self._data[self._front] = self._EMPTY_SLOT
+    self._front = (self._front + 1) & self._mask
     self._size -= 1
+    self._shrink_if_sparse()
     return answer
 
   def delete_last(self) -> Any:
@@ -76,10 +111,11 @@ class ArrayDeque:
     """
     if self.is_empty():
       raise Empty('Queue is empty')
-    back = (self._front + self._size - 1) % len(self._data)
+    back = (self._front + self._size - 1) & self._mask
     answer = self._data[back]
-    self._data[back] = None
+    self._data[back] = self._EMPTY_SLOT
     self._size -= 1
+    self._shrink_if_sparse()
     return answer
 
   def add_last(self, e: Any) -> None:
@@ -90,7 +126,7 @@ class ArrayDeque:
     """
     if self._size == len(self._data):
       self.resize(2 * len(self._data))
-    avail = (self._front + self._size) % len(self._data)
+    avail = (self._front + self._size) & self._mask
     self._data[avail] = e
     self._size += 1
 
@@ -104,24 +140,1048 @@ class ArrayDeque:
     if self._size == len(self._data):
       self.resize(2 * len(self._data))
 
-    self._front = (self._front - 1) % len(self._data)
+    self._front = (self._front - 1) & self._mask
     self._data[self._front] = e
     self._size += 1
 
+  def __getitem__(self, i: int) -> Any:
+    """
+    Returns the element at position i (0 is the front, -1 the back) in O(1).
+
+    Raises:
+      IndexError: If i is out of range.
+    """
+    return self._data[self._physical(i)]
+
+  def __setitem__(self, i: int, e: Any) -> None:
+    """
+    Replaces the element at position i (0 is the front, -1 the back) in O(1).
+
+    Raises:
+      IndexError: If i is out of range.
+    """
+    self._data[self._physical(i)] = e
+
+  def __iter__(self) -> Iterator[Any]:
+    """Yields the elements from front to back without copying them."""
+    data, front, mask = self._data, self._front, self._mask
+    for k in range(self._size):
+      yield data[(front + k) & mask]
+
+  def __reversed__(self) -> Iterator[Any]:
+    """Yields the elements from back to front without copying them."""
+    data, front, mask = self._data, self._front, self._mask
+    for k in range(self._size - 1, -1, -1):
+      yield data[(front + k) & mask]
+
+  def rotate(self, k: int = 1) -> None:
+    """
+    Rotates the deque k steps to the right (to the left if k is negative),
+    so that rotate(1) moves the last element to the front.
+
+    If the array is full only the front index moves. Otherwise
+    min(k, n - k) elements are moved across the gap between back and front.
+    """
+    if self._size == 0:
+      return
+    k %= self._size
+    if k == 0:
+      return
+
+    data, mask = self._data, self._mask
+    if self._size == len(data):
+      self._front = (self._front - k) & mask
+    elif k <= self._size - k:
+      for _ in range(k):
+        back = (self._front + self._size - 1) & mask
+        self._front = (self._front - 1) & mask
+        data[self._front] = data[back]
+        data[back] = self._EMPTY_SLOT
+    else:
+      for _ in range(self._size - k):
+        avail = (self._front + self._size) & mask
+        data[avail] = data[self._front]
+        data[self._front] = self._EMPTY_SLOT
+        self._front = (self._front + 1) & mask
+
+  def extend(self, iterable: Iterable[Any]) -> None:
+    """
+    Adds all elements of iterable to the back of the deque, in order.
+
+    The capacity is grown at most once and the elements are written with
+    at most two slice assignments.
+    """
+    items = self._pack(iterable)
+    self._reserve_for(len(items))
+    self._write((self._front + self._size) & self._mask, items)
+    self._size += len(items)
+
+  def extendleft(self, iterable: Iterable[Any]) -> None:
+    """
+    Adds all elements of iterable to the front of the deque.
+
+    As with repeated add_first calls, the last element of iterable ends up
+    at the front of the deque.
+    """
+    items = self._pack(iterable)
+    items.reverse()
+    self._reserve_for(len(items))
+    front = (self._front - len(items)) & self._mask
+    self._write(front, items)
+    self._front = front
+    self._size += len(items)
+
+  def pop_many_first(self, n: int) -> list[Any]:
+    """
+    Removes and returns up to n elements from the front of the deque, in
+    the order delete_first would return them.
+    """
+    n = max(0, min(n, self._size))
+    answer = self._read(self._front, n)
+    self._erase(self._front, n)
+    self._front = (self._front + n) & self._mask
+    self._size -= n
+    self._shrink_if_sparse()
+    return answer
+
+  def pop_many_last(self, n: int) -> list[Any]:
+    """
+    Removes and returns up to n elements from the back of the deque, in
+    the order delete_last would return them.
+    """
+    n = max(0, min(n, self._size))
+    start = (self._front + self._size - n) & self._mask
+    answer = self._read(start, n)
+    answer.reverse()
+    self._erase(start, n)
+    self._size -= n
+    self._shrink_if_sparse()
+    return answer
+
+  def clear(self) -> None:
+    """Removes all elements and returns to the initial (or reserved) capacity."""
+    self._data = self._allocate(self._min_capacity)
+    self._size = 0
+    self._front = 0
+    self._mask = self._min_capacity - 1
+
+  def capacity(self) -> int:
+    """Returns the number of elements the deque can hold without growing."""
+    return len(self._data)
+
+  def reserve(self, n: int) -> None:
+    """
+    Grows the capacity so that at least n elements fit without resizing.
+
+    The reserved capacity also becomes the floor for automatic shrinking,
+    until shrink_to_fit is called.
+    """
+    if n > len(self._data):
+      self.resize(n)
+    self._min_capacity = max(self._min_capacity, len(self._data))
+
+  def shrink_to_fit(self) -> None:
+    """
+    Shrinks the capacity to the smallest power of two holding all elements.
+
+    The new capacity becomes the floor for automatic shrinking.
+    """
+    capacity = _capacity_for(self._size)
+    if capacity != len(self._data):
+      self.resize(capacity)
+    self._min_capacity = capacity
+
   def resize(self, cap: int) -> None:
     """
     Resizes the underlying array to a new capacity.
 
-    This method re-aligns the elements so that the front of the deque 
-    starts at index 0 in the new array.
+    The capacity is rounded up to a power of two that can hold all current
+    elements. This method re-aligns the elements so that the front of the
+    deque starts at index 0 in the new array, using at most two slice copies.
     """
-    old = self._data
-    self._data = [None] * cap
-    walk = self._front
-    for k in range(self._size):
-      self._data[k] = old[walk]
-      walk = (1 + walk) % len(old)
+    cap = _capacity_for(max(cap, self._size))
+    items = self._read(self._front, self._size)
+    self._data = self._allocate(cap)
+    self._data[:self._size] = items
     self._front = 0
+    self._mask = cap - 1
+
+  def _physical(self, i: int) -> int:
+    """Returns the array index of position i, accepting negative positions."""
+    if i < 0:
+      i += self._size
+    if not 0 <= i < self._size:
+      raise IndexError('Deque index out of range')
+    return (self._front + i) & self._mask
+
+  def _shrink_if_sparse(self) -> None:
+    """Halves the capacity (possibly several times) while under a quarter full."""
+    capacity = len(self._data)
+    while capacity > self._min_capacity and 4 * self._size < capacity:
+      capacity //= 2
+    if capacity != len(self._data):
+      self.resize(capacity)
+
+  def _reserve_for(self, n: int) -> None:
+    """Grows the capacity once so that n more elements fit."""
+    if self._size + n > len(self._data):
+      self.resize(max(self._size + n, 2 * len(self._data)))
+
+  def _read(self, start: int, n: int) -> list[Any]:
+    """Returns n elements starting at physical index start (wrapping around)."""
+    end = start + n
+    if end <= len(self._data):
+      return self._data[start:end]
+    return self._data[start:] + self._data[:end - len(self._data)]
+
+  def _write(self, start: int, items: list[Any]) -> None:
+    """Stores items starting at physical index start (wrapping around)."""
+    # Skip empty assignments: array.array rejects even those while it exports buffers
+    if not items:
+      return
+    split = min(len(items), len(self._data) - start)
+    self._data[start:start + split] = items[:split]
+    if split < len(items):
+      self._data[:len(items) - split] = items[split:]
+
+  def _erase(self, start: int, n: int) -> None:
+    """Clears n slots starting at physical index start (wrapping around)."""
+    self._write(start, self._allocate(n))
+
+  def _allocate(self, n: int) -> list[Any]:
+    """Returns storage for n empty slots."""
+    return [None] * n
+
+  def _pack(self, iterable: Iterable[Any]) -> list[Any]:
+    """Returns the elements of iterable in the storage's sequence type."""
+    return list(iterable)
+
+class TypedArrayDeque(ArrayDeque):
+  """
+  ArrayDeque that stores numbers unboxed in an array.array ring buffer.
+
+  Each slot holds the raw machine value for the given typecode (for
+  example 8 bytes for 'd' or 'q') instead of a pointer to a Python object,
+  which takes several times less memory and keeps the elements contiguous.
+  The API is the same as ArrayDeque, except that the batch methods
+  (pop_many_first, pop_many_last) return array.array objects.
+  """
+
+  __slots__ = ('_typecode',)
+
+  NUMERIC_TYPECODES = 'bBhHiIlLqQfd'
+
+  _EMPTY_SLOT = 0
+
+  def __init__(self, typecode: str, capacity: int = ArrayDeque.DEFAULT_CAPACITY) -> None:
+    """
+    Initializes an empty typed deque.
+
+    Args:
+      typecode: array.array typecode of the elements (one of 'bBhHiIlLqQfd').
+      capacity: Initial capacity, rounded up to a power of two.
+
+    Raises:
+      ValueError: If typecode is not a numeric array typecode.
+    """
+    if typecode not in TypedArrayDeque.NUMERIC_TYPECODES:
+      raise ValueError(f'Unsupported typecode: {typecode!r}')
+    self._typecode = typecode
+    super().__init__(capacity)
+
+  @property
+  def typecode(self) -> str:
+    """Returns the array.array typecode of the stored elements."""
+    return self._typecode
+
+  def segments(self) -> tuple[memoryview, ...]:
+    """
+    Returns zero-copy memoryviews of the elements in front-to-back order.
+
+    The elements occupy one contiguous run of the ring buffer, or two when
+    they wrap around its end. The views share memory with the deque; they
+    stay valid after a resize but then no longer reflect later changes, so
+    they should be released (or dropped) once the data has been consumed.
+    """
+    view = memoryview(self._data)
+    end = self._front + self._size
+    if end <= len(self._data):
+      return (view[self._front:end],)
+    return (view[self._front:], view[:end - len(self._data)])
+
+  def _erase(self, start: int, n: int) -> None:
+    """Unboxed slots hold no references, so there is nothing to clear."""
+
+  def _allocate(self, n: int) -> array:
+    """Returns a zero-filled array of n slots."""
+    return array(self._typecode, bytes(n * array(self._typecode).itemsize))
+
+  def _pack(self, iterable: Iterable[Any]) -> array:
+    """Returns the elements of iterable as an array of this typecode."""
+    return array(self._typecode, iterable)
+
+class PersistentArrayDeque:
+  """
+  Typed deque that lives in fixed-size, memory-mapped segment files, so a
+  backlog can outgrow RAM and survive restarts.
+
+  Elements use the same front/size arithmetic as ArrayDeque, but positions
+  are absolute: position p is slot p & (segment_size - 1) of segment
+  p >> log2(segment_size), and front may become negative after add_first.
+  Only a few segments are mapped at a time. The head and tail segments
+  stay mapped, while middle segments are unmapped once they are no longer
+  used, so their data lives on disk (and in the page cache) instead of in
+  the process. A segment file is deleted once every element in it has been
+  removed.
+
+  The front and size are saved in a metadata file every sync_interval
+  updates, by sync() and by close(). Segment data is flushed to disk
+  before the metadata is atomically replaced, so reopening after a crash
+  restores the deque as of the last sync; later updates may be lost.
+  Slots of the synced range are never overwritten before the next sync:
+  a write into that range (e.g. add_last right after delete_last) syncs
+  first, and __setitem__ syncs again once the element is replaced.
+  """
+
+  MAGIC = b'PADEQUE1'
+  META_FILE = 'deque.meta'
+  OPEN_SEGMENTS = 4
+
+  _META = struct.Struct('<8s2sqqq')
+
+  def __init__(
+    self,
+    directory: str,
+    typecode: str | None = None,
+    segment_size: int = 1 << 16,
+    sync_interval: int = 4096
+  ) -> None:
+    """
+    Opens the deque stored in directory, creating it if necessary.
+
+    Args:
+      directory: Directory holding the metadata and segment files.
+      typecode: array.array typecode of the elements (default 'q' for new
+        deques; must match the stored typecode when reopening).
+      segment_size: Elements per segment file, rounded up to a power of two
+        (ignored when reopening).
+      sync_interval: Number of updates between automatic syncs.
+
+    Raises:
+      ValueError: If the typecode is not numeric or does not match the
+        existing deque, or the metadata file is not valid.
+    """
+    os.makedirs(directory, exist_ok=True)
+    self._directory = directory
+    self._meta_path = os.path.join(directory, PersistentArrayDeque.META_FILE)
+
+    if os.path.exists(self._meta_path):
+      with open(self._meta_path, 'rb') as meta:
+        magic, stored, segment_size, self._front, self._size = PersistentArrayDeque._META.unpack(meta.read())
+      stored = stored.rstrip(b'\0').decode()
+      if magic != PersistentArrayDeque.MAGIC:
+        raise ValueError(f'{self._meta_path} is not a deque metadata file.')
+      if typecode is not None and typecode != stored:
+        raise ValueError(f'Deque stores {stored!r} elements, not {typecode!r}.')
+      typecode = stored
+    else:
+      typecode = typecode or 'q'
+      segment_size = _capacity_for(segment_size)
+      self._front = 0
+      self._size = 0
+
+    if typecode not in TypedArrayDeque.NUMERIC_TYPECODES:
+      raise ValueError(f'Unsupported typecode: {typecode!r}')
+
+    self._typecode = typecode
+    self._segment_size = segment_size
+    self._segment_bytes = segment_size * array(typecode).itemsize
+    self._shift = segment_size.bit_length() - 1
+    self._mask = segment_size - 1
+    self._sync_interval = sync_interval
+    self._pending = 0
+    self._mapped = collections.OrderedDict()
+    self._dirty = set()
+    self._retired = set()
+
+    self._write_meta()
+    self._synced_front = self._front
+    self._synced_size = self._size
+    self._remove_dead_segments()
+
+  def __len__(self) -> int:
+    """Returns the number of elements currently in the deque."""
+    return self._size
+
+  def is_empty(self) -> bool:
+    """Returns True if the deque contains no elements."""
+    return self._size == 0
+
+  def first(self) -> Any:
+    """
+    Returns (but does not remove) the element at the front of the deque.
+
+    Raises:
+      Empty: If the deque is empty.
+    """
+    if self.is_empty():
+      raise Empty('Queue is empty')
+    return self._load(self._front)
+
+  def last(self) -> Any:
+    """
+    Returns (but does not remove) the element at the back of the deque.
+
+    Raises:
+      Empty: If the deque is empty.
+    """
+    if self.is_empty():
+      raise Empty('Queue is empty')
+    return self._load(self._front + self._size - 1)
+
+  def __getitem__(self, i: int) -> Any:
+    """
+    Returns the element at position i (0 is the front, -1 the back).
+
+    Raises:
+      IndexError: If i is out of range.
+    """
+    if i < 0:
+      i += self._size
+    if not 0 <= i < self._size:
+      raise IndexError('Deque index out of range')
+    return self._load(self._front + i)
+
+  def __setitem__(self, i: int, e: Any) -> None:
+    """
+    Replaces the element at position i (0 is the front, -1 the back) and
+    syncs, since the old element may belong to the synced state.
+
+    Raises:
+      IndexError: If i is out of range.
+    """
+    if i < 0:
+      i += self._size
+    if not 0 <= i < self._size:
+      raise IndexError('Deque index out of range')
+    self._store(self._front + i, e)
+    self.sync()
+
+  def __iter__(self) -> Iterator[Any]:
+    """Yields the elements from front to back."""
+    for position in range(self._front, self._front + self._size):
+      yield self._load(position)
+
+  def __reversed__(self) -> Iterator[Any]:
+    """Yields the elements from back to front."""
+    for position in range(self._front + self._size - 1, self._front - 1, -1):
+      yield self._load(position)
+
+  def add_last(self, e: Any) -> None:
+    """Adds an element to the back of the deque."""
+    self._store(self._front + self._size, e)
+    self._size += 1
+    self._updated()
+
+  def add_first(self, e: Any) -> None:
+    """Adds an element to the front of the deque."""
+    self._store(self._front - 1, e)
+    self._front -= 1
+    self._size += 1
+    self._updated()
+
+  def delete_first(self) -> Any:
+    """
+    Removes and returns the first element of the deque.
+
+    Raises:
+      Empty: If the deque is empty.
+    """
+    if self.is_empty():
+      raise Empty('Queue is empty')
+    position = self._front
+    answer = self._load(position)
+    self._front += 1
+    self._size -= 1
+    self._release_if_dead(position >> self._shift)
+    self._updated()
+    return answer
+
+  def delete_last(self) -> Any:
+    """
+    Removes and returns the last element of the deque.
+
+    Raises:
+      Empty: If the deque is empty.
+    """
+    if self.is_empty():
+      raise Empty('Queue is empty')
+    position = self._front + self._size - 1
+    answer = self._load(position)
+    self._size -= 1
+    self._release_if_dead(position >> self._shift)
+    self._updated()
+    return answer
+
+  def rotate(self, k: int = 1) -> None:
+    """
+    Rotates the deque k steps to the right (to the left if k is negative),
+    so that rotate(1) moves the last element to the front.
+
+    min(k, n - k) elements are moved from one end to the other.
+    """
+    if self._size == 0:
+      return
+    k %= self._size
+    if k <= self._size - k:
+      for _ in range(k):
+        self.add_first(self.delete_last())
+    else:
+      for _ in range(self._size - k):
+        self.add_last(self.delete_first())
+
+  def extend(self, iterable: Iterable[Any]) -> None:
+    """Adds all elements of iterable to the back of the deque, in order."""
+    for e in iterable:
+      self.add_last(e)
+
+  def extendleft(self, iterable: Iterable[Any]) -> None:
+    """
+    Adds all elements of iterable to the front of the deque.
+
+    As with repeated add_first calls, the last element of iterable ends up
+    at the front of the deque.
+    """
+    for e in iterable:
+      self.add_first(e)
+
+  def pop_many_first(self, n: int) -> list[Any]:
+    """
+    Removes and returns up to n elements from the front of the deque, in
+    the order delete_first would return them.
+    """
+    n = max(0, min(n, self._size))
+    return [self.delete_first() for _ in range(n)]
+
+  def pop_many_last(self, n: int) -> list[Any]:
+    """
+    Removes and returns up to n elements from the back of the deque, in
+    the order delete_last would return them.
+    """
+    n = max(0, min(n, self._size))
+    return [self.delete_last() for _ in range(n)]
+
+  def clear(self) -> None:
+    """Removes all elements; their segment files are deleted by the next sync."""
+    live = self._live_segments()
+    self._front += self._size
+    self._size = 0
+    for segment in live:
+      self._release_if_dead(segment)
+    self._updated()
+
+  def sync(self) -> None:
+    """
+    Makes all updates so far durable: flushes modified segments, then
+    atomically replaces the metadata and deletes emptied segment files.
+    """
+    for segment in self._dirty:
+      self._mapped[segment][0].flush()
+    self._dirty.clear()
+    self._write_meta()
+
+    for segment in self._retired:
+      os.remove(self._segment_path(segment))
+    self._retired.clear()
+    self._synced_front = self._front
+    self._synced_size = self._size
+    self._pending = 0
+
+  def close(self) -> None:
+    """Syncs the deque and unmaps all segments."""
+    self.sync()
+    while self._mapped:
+      self._unmap(next(iter(self._mapped)))
+
+  def __enter__(self) -> 'PersistentArrayDeque':
+    return self
+
+  def __exit__(self, *exc_info: Any) -> None:
+    self.close()
+
+  def _load(self, position: int) -> Any:
+    """Returns the element stored at an absolute position."""
+    return self._segment(position >> self._shift)[position & self._mask]
+
+  def _store(self, position: int, e: Any) -> None:
+    """Stores e at an absolute position, syncing first if it holds synced data."""
+    if self._synced_front <= position < self._synced_front + self._synced_size:
+      self.sync()
+    segment = position >> self._shift
+    self._segment(segment)[position & self._mask] = e
+    self._dirty.add(segment)
+
+  def _updated(self) -> None:
+    """Counts an update and syncs every sync_interval updates."""
+    self._pending += 1
+    if self._pending >= self._sync_interval:
+      self.sync()
+
+  def _segment(self, segment: int) -> memoryview:
+    """Returns a typed view of a segment, mapping (or creating) it if needed."""
+    entry = self._mapped.get(segment)
+    if entry is not None:
+      self._mapped.move_to_end(segment)
+      return entry[1]
+
+    self._retired.discard(segment)
+    path = self._segment_path(segment)
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as segment_file:
+      segment_file.truncate(self._segment_bytes)
+      mapped = mmap.mmap(segment_file.fileno(), self._segment_bytes)
+    view = memoryview(mapped).cast(self._typecode)
+    self._mapped[segment] = (mapped, view)
+
+    # Keep the head and tail segments mapped; unmap the least recently used others
+    live = self._live_segments()
+    hot = {live[0], live[-1]} if live else set()
+    for candidate in list(self._mapped):
+      if len(self._mapped) <= PersistentArrayDeque.OPEN_SEGMENTS:
+        break
+      if candidate != segment and candidate not in hot:
+        self._unmap(candidate)
+    return view
+
+  def _unmap(self, segment: int) -> None:
+    """Flushes (if modified) and unmaps a segment."""
+    mapped, view = self._mapped.pop(segment)
+    if segment in self._dirty:
+      mapped.flush()
+      self._dirty.discard(segment)
+    view.release()
+    mapped.close()
+
+  def _release_if_dead(self, segment: int) -> None:
+    """Retires a segment that no longer holds any element."""
+    if segment in self._live_segments():
+      return
+    if segment in self._mapped:
+      self._unmap(segment)
+    self._retired.add(segment)
+
+  def _live_segments(self) -> range:
+    """Returns the range of segments that hold elements."""
+    if self._size == 0:
+      return range(0)
+    return range(self._front >> self._shift, ((self._front + self._size - 1) >> self._shift) + 1)
+
+  def _segment_path(self, segment: int) -> str:
+    """Returns the file name of a segment."""
+    return os.path.join(self._directory, f'{segment}.segment')
+
+  def _write_meta(self) -> None:
+    """Atomically replaces the metadata file with the current front and size."""
+    data = PersistentArrayDeque._META.pack(
+      PersistentArrayDeque.MAGIC,
+      self._typecode.encode(),
+      self._segment_size,
+      self._front,
+      self._size
+    )
+    temporary = self._meta_path + '.tmp'
+    with open(temporary, 'wb') as meta:
+      meta.write(data)
+      meta.flush()
+      os.fsync(meta.fileno())
+    os.replace(temporary, self._meta_path)
+
+  def _remove_dead_segments(self) -> None:
+    """Deletes segment files left over from updates after the last sync."""
+    live = self._live_segments()
+    for name in os.listdir(self._directory):
+      stem, extension = os.path.splitext(name)
+      if extension == '.segment' and int(stem) not in live:
+        os.remove(os.path.join(self._directory, name))
+
+class _BoundedDeque:
+  """
+  Shared core of the concurrent deques: an ArrayDeque with an optional
+  maximum length. Callers must hold the lock of the subclass.
+  """
+
+  def __init__(
+    self,
+    maxlen: int | None = None,
+    overwrite: bool = False,
+    typecode: str | None = None
+  ) -> None:
+    """
+    Args:
+      maxlen: Maximum number of elements, or None for unbounded.
+      overwrite: When full, drop the element at the opposite end instead of
+        blocking the producer (ring-buffer mode).
+      typecode: If given, elements are stored in a TypedArrayDeque.
+
+    Raises:
+      ValueError: If maxlen is not positive.
+    """
+    if maxlen is not None and maxlen <= 0:
+      raise ValueError('maxlen must be positive.')
+    self._deque = ArrayDeque() if typecode is None else TypedArrayDeque(typecode)
+    self._maxlen = maxlen
+    self._overwrite = overwrite
+
+  @property
+  def maxlen(self) -> int | None:
+    """Returns the maximum length, or None if the deque is unbounded."""
+    return self._maxlen
+
+  def __len__(self) -> int:
+    """Returns the number of elements currently in the deque."""
+    return len(self._deque)
+
+  def _has_items(self) -> bool:
+    """Returns True if a get would not block."""
+    return not self._deque.is_empty()
+
+  def _has_room(self) -> bool:
+    """Returns True if a put would neither block nor overwrite."""
+    return self._maxlen is None or len(self._deque) < self._maxlen
+
+  def _put(self, e: Any, first: bool) -> None:
+    """Adds e at the chosen end, dropping from the other end in overwrite mode."""
+    if not self._has_room():
+      if first:
+        self._deque.delete_last()
+      else:
+        self._deque.delete_first()
+    if first:
+      self._deque.add_first(e)
+    else:
+      self._deque.add_last(e)
+
+  def _get(self, first: bool) -> Any:
+    """Removes an element from the chosen end."""
+    return self._deque.delete_first() if first else self._deque.delete_last()
+
+class ConcurrentArrayDeque(_BoundedDeque):
+  """
+  Thread-safe deque with blocking puts and gets, for producer/consumer
+  work queues between threads.
+
+  get_* calls wait while the deque is empty. With a maxlen, put_* calls
+  wait while it is full, or in overwrite mode drop the element at the
+  opposite end. All waits accept block=False or a timeout in seconds and
+  raise Empty/Full when they give up, like queue.Queue.
+  """
+
+  def __init__(
+    self,
+    maxlen: int | None = None,
+    overwrite: bool = False,
+    typecode: str | None = None
+  ) -> None:
+    """Initializes an empty deque (see _BoundedDeque for the arguments)."""
+    super().__init__(maxlen, overwrite, typecode)
+    self._lock = threading.Lock()
+    self._not_empty = threading.Condition(self._lock)
+    self._not_full = threading.Condition(self._lock)
+
+  def put_first(self, e: Any, block: bool = True, timeout: float | None = None) -> None:
+    """Adds e to the front, waiting for room if the deque is full."""
+    self._put_waiting(e, True, block, timeout)
+
+  def put_last(self, e: Any, block: bool = True, timeout: float | None = None) -> None:
+    """Adds e to the back, waiting for room if the deque is full."""
+    self._put_waiting(e, False, block, timeout)
+
+  def get_first(self, block: bool = True, timeout: float | None = None) -> Any:
+    """Removes and returns the front element, waiting if the deque is empty."""
+    return self._get_waiting(True, block, timeout)
+
+  def get_last(self, block: bool = True, timeout: float | None = None) -> Any:
+    """Removes and returns the back element, waiting if the deque is empty."""
+    return self._get_waiting(False, block, timeout)
+
+  def get_many(self, n: int, block: bool = True, timeout: float | None = None) -> list[Any]:
+    """
+    Removes and returns up to n elements from the front under a single lock
+    acquisition. Waits only until at least one element is available.
+
+    Raises:
+      Empty: If no element became available.
+    """
+    with self._not_empty:
+      if not self._has_items():
+        if not self._wait(self._not_empty, self._has_items, block, timeout):
+          raise Empty('Queue is empty')
+      answer = self._deque.pop_many_first(n)
+      self._not_full.notify(len(answer))
+      return list(answer)
+
+  def _put_waiting(self, e: Any, first: bool, block: bool, timeout: float | None) -> None:
+    """Waits for room (unless overwriting), then adds e and wakes a consumer."""
+    with self._not_full:
+      if not self._overwrite and not self._has_room():
+        if not self._wait(self._not_full, self._has_room, block, timeout):
+          raise Full('Queue is full')
+      self._put(e, first)
+      self._not_empty.notify()
+
+  def _get_waiting(self, first: bool, block: bool, timeout: float | None) -> Any:
+    """Waits for an element, then removes it and wakes a producer."""
+    with self._not_empty:
+      if not self._has_items():
+        if not self._wait(self._not_empty, self._has_items, block, timeout):
+          raise Empty('Queue is empty')
+      answer = self._get(first)
+      self._not_full.notify()
+      return answer
+
+  @staticmethod
+  def _wait(
+    condition: threading.Condition,
+    predicate: Any,
+    block: bool,
+    timeout: float | None
+  ) -> bool:
+    """Waits on condition until predicate holds, if blocking is allowed."""
+    if not block:
+      return False
+    return condition.wait_for(predicate, timeout)
+
+class AsyncArrayDeque(_BoundedDeque):
+  """
+  asyncio counterpart of ConcurrentArrayDeque with the same semantics.
+
+  The put_*/get_* methods are coroutines that suspend the calling task
+  instead of blocking a thread. They must be used from a single event loop.
+  """
+
+  def __init__(
+    self,
+    maxlen: int | None = None,
+    overwrite: bool = False,
+    typecode: str | None = None
+  ) -> None:
+    """Initializes an empty deque (see _BoundedDeque for the arguments)."""
+    super().__init__(maxlen, overwrite, typecode)
+    self._lock = asyncio.Lock()
+    self._not_empty = asyncio.Condition(self._lock)
+    self._not_full = asyncio.Condition(self._lock)
+
+  async def put_first(self, e: Any, block: bool = True, timeout: float | None = None) -> None:
+    """Adds e to the front, waiting for room if the deque is full."""
+    await self._put_waiting(e, True, block, timeout)
+
+  async def put_last(self, e: Any, block: bool = True, timeout: float | None = None) -> None:
+    """Adds e to the back, waiting for room if the deque is full."""
+    await self._put_waiting(e, False, block, timeout)
+
+  async def get_first(self, block: bool = True, timeout: float | None = None) -> Any:
+    """Removes and returns the front element, waiting if the deque is empty."""
+    return await self._get_waiting(True, block, timeout)
+
+  async def get_last(self, block: bool = True, timeout: float | None = None) -> Any:
+    """Removes and returns the back element, waiting if the deque is empty."""
+    return await self._get_waiting(False, block, timeout)
+
+  async def get_many(self, n: int, block: bool = True, timeout: float | None = None) -> list[Any]:
+    """
+    Removes and returns up to n elements from the front in one step.
+    Waits only until at least one element is available.
+
+    Raises:
+      Empty: If no element became available.
+    """
+    async with self._not_empty:
+      if not self._has_items():
+        if not await self._wait(self._not_empty, self._has_items, block, timeout):
+          raise Empty('Queue is empty')
+      answer = self._deque.pop_many_first(n)
+      self._not_full.notify(len(answer))
+      return list(answer)
+
+  async def _put_waiting(self, e: Any, first: bool, block: bool, timeout: float | None) -> None:
+    """Waits for room (unless overwriting), then adds e and wakes a consumer."""
+    async with self._not_full:
+      if not self._overwrite and not self._has_room():
+        if not await self._wait(self._not_full, self._has_room, block, timeout):
+          raise Full('Queue is full')
+      self._put(e, first)
+      self._not_empty.notify()
+
+  async def _get_waiting(self, first: bool, block: bool, timeout: float | None) -> Any:
+    """Waits for an element, then removes it and wakes a producer."""
+    async with self._not_empty:
+      if not self._has_items():
+        if not await self._wait(self._not_empty, self._has_items, block, timeout):
+          raise Empty('Queue is empty')
+      answer = self._get(first)
+      self._not_full.notify()
+      return answer
+
+  @staticmethod
+  async def _wait(
+    condition: asyncio.Condition,
+    predicate: Any,
+    block: bool,
+    timeout: float | None
+  ) -> bool:
+    """Waits on condition until predicate holds, if blocking is allowed."""
+    if not block:
+      return False
+    try:
+      return await asyncio.wait_for(condition.wait_for(predicate), timeout)
+    except TimeoutError:
+      return False
+
+class SlidingWindow:
+  """
+  The last 'width' values of a stream, with O(1) amortized min() and max().
+
+  Besides the window itself, two monotonic deques of (position, value)
+  pairs are kept: one with increasing values for the minimum and one with
+  decreasing values for the maximum. A new value removes from their back
+  every value it makes irrelevant, and values that left the window are
+  removed from their front, so each value enters and leaves them once.
+  """
+
+  def __init__(self, width: int) -> None:
+    """
+    Raises:
+      ValueError: If width is not positive.
+    """
+    if width <= 0:
+      raise ValueError('width must be positive.')
+    self._width = width
+    self._values = ArrayDeque()
+    self._minima = ArrayDeque()
+    self._maxima = ArrayDeque()
+    self._pushed = 0
+
+  def __len__(self) -> int:
+    """Returns the number of values currently in the window."""
+    return len(self._values)
+
+  def __getitem__(self, i: int) -> Any:
+    """Returns the i-th value of the window (0 is the oldest)."""
+    return self._values[i]
+
+  def __iter__(self) -> Iterator[Any]:
+    """Yields the values of the window from oldest to newest."""
+    return iter(self._values)
+
+  def is_full(self) -> bool:
+    """Returns True if the window holds 'width' values."""
+    return len(self._values) == self._width
+
+  def push(self, value: Any) -> None:
+    """Adds value to the window, dropping the oldest value if it is full."""
+    if self.is_full():
+      self._values.delete_first()
+    self._values.add_last(value)
+
+    while not self._minima.is_empty() and value < self._minima.last()[1]:
+      self._minima.delete_last()
+    self._minima.add_last((self._pushed, value))
+    while not self._maxima.is_empty() and self._maxima.last()[1] < value:
+      self._maxima.delete_last()
+    self._maxima.add_last((self._pushed, value))
+
+    self._pushed += 1
+    oldest = self._pushed - self._width
+    if self._minima.first()[0] < oldest:
+      self._minima.delete_first()
+    if self._maxima.first()[0] < oldest:
+      self._maxima.delete_first()
+
+  def min(self) -> Any:
+    """
+    Returns the smallest value in the window.
+
+    Raises:
+      Empty: If no value has been pushed yet.
+    """
+    if self._minima.is_empty():
+      raise Empty('Window is empty')
+    return self._minima.first()[1]
+
+  def max(self) -> Any:
+    """
+    Returns the largest value in the window.
+
+    Raises:
+      Empty: If no value has been pushed yet.
+    """
+    if self._maxima.is_empty():
+      raise Empty('Window is empty')
+    return self._maxima.first()[1]
+
+def sliding_window_min(iterable: Iterable[Any], width: int) -> Iterator[Any]:
+  """Yields the minimum of every full window of 'width' consecutive values."""
+  window = SlidingWindow(width)
+  for value in iterable:
+    window.push(value)
+    if window.is_full():
+      yield window.min()
+
+def sliding_window_max(iterable: Iterable[Any], width: int) -> Iterator[Any]:
+  """Yields the maximum of every full window of 'width' consecutive values."""
+  window = SlidingWindow(width)
+  for value in iterable:
+    window.push(value)
+    if window.is_full():
+      yield window.max()
+
+def benchmark_queues(n: int = 200_000, maxlen: int = 1000, batch: int = 100) -> None:
+  """
+  Measures producer/consumer throughput between two threads for
+  ConcurrentArrayDeque (single and batched gets), queue.Queue and a
+  collections.deque that the consumer has to poll.
+  """
+  def run(name: str, produce: Any, consume: Any) -> None:
+    producer = threading.Thread(target=produce)
+    start = time.perf_counter()
+    producer.start()
+    consume()
+    producer.join()
+    elapsed = time.perf_counter() - start
+    print(f'{name}: {n / elapsed:,.0f} items/s')
+
+  d = ConcurrentArrayDeque(maxlen)
+  def consume_one() -> None:
+    for _ in range(n):
+      d.get_first()
+  run('ConcurrentArrayDeque get_first', lambda: [d.put_last(i) for i in range(n)], consume_one)
+
+  d = ConcurrentArrayDeque(maxlen)
+  def consume_many() -> None:
+    received = 0
+    while received < n:
+      received += len(d.get_many(batch))
+  run(f'ConcurrentArrayDeque get_many({batch})', lambda: [d.put_last(i) for i in range(n)], consume_many)
+
+  q = queue.Queue(maxlen)
+  def consume_queue() -> None:
+    for _ in range(n):
+      q.get()
+  run('queue.Queue', lambda: [q.put(i) for i in range(n)], consume_queue)
+
+  c = collections.deque()
+  def consume_polling() -> None:
+    received = 0
+    while received < n:
+      try:
+        c.popleft()
+        received += 1
+      except IndexError:
+        time.sleep(0)
+  run('collections.deque (polling, unbounded)', lambda: [c.append(i) for i in range(n)], consume_polling)
+
+def _capacity_for(n: int) -> int:
+  """Returns the smallest power of two that is at least n (and at least 1)."""
+  return 1 << (max(n, 1) - 1).bit_length()
 
 def test_array_deque() -> None:
   """Execute a series of tests to verify ArrayDeque functionality."""
@@ -168,6 +1228,59 @@ def test_array_deque() -> None:
   print("len:", len(d))
   print()
 
+  print("Bulk operations")
+  d.extend(range(20, 30))
+  d.extendleft([-1, -2, -3])
+  print("first:", d.first())
+  print("last:", d.last())
+  print("pop_many_first(4):", d.pop_many_first(4))
+  print("pop_many_last(3):", d.pop_many_last(3))
+  print("len:", len(d))
+  print()
+
+  print("Capacity after a burst")
+  d.extend(range(1000))
+  print("capacity at peak:", d.capacity())
+  d.pop_many_first(1000)
+  print("capacity after draining:", d.capacity())
+  d.reserve(100)
+  print("capacity after reserve(100):", d.capacity())
+  d.shrink_to_fit()
+  print("capacity after shrink_to_fit:", d.capacity())
+  print()
+
+  print("Random access and rotation")
+  print("d[0], d[-1]:", d[0], d[-1])
+  d.rotate(2)
+  print("after rotate(2):", list(d)[:5], "...")
+  d.rotate(-2)
+  print("reversed, first 3:", list(reversed(d))[:3])
+  print()
+
+  print("Sliding window")
+  stream = [5, 1, 4, 7, 3, 8, 2, 6]
+  print("stream:", stream)
+  print("min over 3:", list(sliding_window_min(stream, 3)))
+  print("max over 3:", list(sliding_window_max(stream, 3)))
+  print()
+
+  print("Typed deque")
+  t = TypedArrayDeque('d')
+  t.extend([1.5, 2.5, 3.5])
+  t.add_first(0.5)
+  print("first:", t.first())
+  print("last:", t.last())
+  print("segments:", [list(segment) for segment in t.segments()])
+  segments = t.segments()
+  t.extendleft([-0.5])
+  t.extend([4.5])
+  t.extend([])
+  t.extendleft([])
+  print("extended while segments are alive:", list(t))
+  for segment in segments:
+    segment.release()
+  print()
+
   print("Emptying deque")
   while not d.is_empty():
     d.delete_first()
@@ -181,5 +1294,34 @@ def test_array_deque() -> None:
     d.delete_first()
   except Empty as e:
     print("Caught exception:", e)
+  print()
+
+  print("Persistent deque")
+  with tempfile.TemporaryDirectory() as directory:
+    with PersistentArrayDeque(directory, 'q', segment_size=4) as p:
+      for i in range(10):
+        p.add_last(i)
+      p.add_first(-1)
+      print("deleted first:", p.delete_first())
+      p.rotate(2)
+      p[0] = 100
+      print("after rotate(2) and p[0] = 100:", list(p))
+    with PersistentArrayDeque(directory) as p:
+      print("after reopening:", list(p))
+  print()
+
+  print("Concurrent deque")
+  c = ConcurrentArrayDeque(maxlen=3, overwrite=True)
+  for i in range(5):
+    c.put_last(i)
+  print("get_many(10):", c.get_many(10))
+  try:
+    c.get_first(timeout=0.01)
+  except Empty as e:
+    print("Caught exception:", e)
 
-test_array_deque()
\ No newline at end of file
+if __name__ == '__main__':
+  if '--benchmark' in sys.argv[1:]:
+    benchmark_queues()
+  else:
+    test_array_deque()
\ No newline at end of file
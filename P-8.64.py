@@ -1,19 +1,99 @@
 # [P-8.64] Implement the binary tree ADT using the array-based representation described in Section 8.3.2.
 
-from typing import Any, List, Self
+import heapq
+import itertools
+import mmap
+import operator
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Self
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class ArrayBinaryTree:
     """
     Array-based implementation of a Binary Tree ADT.
     Positions are represented by integer indices.
+
+    Elements are kept in a list (dense storage) as long as the tree fills a
+    reasonable share of it. A node at depth d sits at index ~2^d, so deep,
+    unbalanced trees would otherwise allocate exponentially many empty
+    slots; once the fill ratio drops below SPARSE_RATIO the elements move to
+    a dict keyed by index (sparse storage), and back to a list once the
+    tree becomes dense enough again.
+
+    Dense storage keeps an occupancy bytearray next to the list (1 for a
+    node, 0 for an empty slot), so whole-tree queries such as leaves() can
+    run as a few operations over the whole array instead of per node.
     """
 
+    SPARSE_RATIO = 1 / 8
+    DENSE_RATIO = 1 / 2
+    SPARSE_MIN_CAPACITY = 1024
+
+    MAGIC = b'ABTREE01'
+    _HEADER = struct.Struct('<8sccqqqqq')
+
     # Initialization
 
     def __init__(self) -> None:
         """Initialize an empty binary tree."""
-        self._data: List[Any] = []
+        self._data: List[Any] | Dict[int, Any] = []
         self._size: int = 0
+        self._sparse: bool = False
+        self._extent: int = 0
+        self._levels: List[int] = []
+        self._mapped: bool = False
+        self._occupied: bytearray = bytearray()
+
+    @classmethod
+    def from_level_order(cls, iterable: Iterable[Any], missing: Any = None) -> 'ArrayBinaryTree':
+        """
+        Builds a tree from its elements in level order (index order), where
+        missing marks empty positions. The elements are copied into the
+        storage list once instead of being added node by node.
+
+        Raises:
+            ValueError: If a node has no parent.
+        """
+        data = list(iterable)
+        if missing is not None:
+            for i, val in enumerate(data):
+                if val == missing:
+                    data[i] = None
+        while data and data[-1] is None:
+            data.pop()
+
+        occupied = bytearray(map(operator.is_not, data, itertools.repeat(None)))
+        for first, children in ((1, occupied[1::2]), (2, occupied[2::2])):
+            parents = int.from_bytes(occupied[:len(children)], 'little')
+            orphans = int.from_bytes(children, 'little') & ~parents
+            if orphans:
+                parent = ((orphans & -orphans).bit_length() - 1) // 8
+                raise ValueError(f"Node at index {2 * parent + first} has no parent.")
+
+        tree = cls()
+        tree._data = data
+        tree._occupied = occupied
+        tree._extent = len(data)
+        tree._size = occupied.count(1)
+        width = 1
+        while width - 1 < len(data):
+            tree._levels.append(occupied[width - 1:2 * width - 1].count(1))
+            width *= 2
+        if data and len(data) >= cls.SPARSE_MIN_CAPACITY and tree._size / len(data) < cls.SPARSE_RATIO:
+            tree._to_sparse()
+        return tree
 
     # Basic Utilities
 
@@ -25,6 +105,14 @@ class ArrayBinaryTree:
         """Returns True if the tree is empty."""
         return len(self) == 0
 
+    def is_sparse(self) -> bool:
+        """Returns True if the elements are currently stored in a dict."""
+        return self._sparse
+
+    def fill_ratio(self) -> float:
+        """Returns the share of the index range [0, extent) that holds nodes."""
+        return self._size / self._extent if self._extent else 1.0
+
     # Accessors
 
     def root(self) -> int | None:
@@ -40,13 +128,13 @@ class ArrayBinaryTree:
         """Returns the left child of p or None if it does not exist."""
         p = self._validate(p)
         left = 2 * p + 1
-        return None if left >= len(self._data) or self._data[left] is None else left
+        return None if self._get(left) is None else left
 
     def right(self, p: int) -> int | None:
         """Returns the right child of p or None if it does not exist."""
         p = self._validate(p)
         right = 2 * p + 2
-        return None if right >= len(self._data) or self._data[right] is None else right
+        return None if self._get(right) is None else right
 
     def sibling(self, p: int) -> int | None:
         """Returns the sibling of p or None if no sibling exists."""
@@ -83,32 +171,114 @@ class ArrayBinaryTree:
         return self.left(p) is None and self.right(p) is None
 
     def depth(self, p: int) -> int:
-        """Returns the depth of position p."""
+        """Returns the depth of position p, which is floor(log2(p + 1))."""
         p = self._validate(p)
-        if self.is_root(p):
-            return 0
-        return 1 + self.depth(self.parent(p))
+        return (p + 1).bit_length() - 1
 
     def subtree_height(self, p: int) -> int:
         """Returns the height of the subtree rooted at p."""
         p = self._validate(p)
-        if self.is_leaf(p):
-            return 0
+        get = self._get
+        height = -1
+        level = [p]
+        while level:
+            height += 1
+            level = [c for q in level for c in (2 * q + 1, 2 * q + 2) if get(c) is not None]
+        return height
 
-        left = self.left(p)
-        right = self.right(p)
+    def height(self) -> int:
+        """Returns the height of the tree, kept up to date by every update."""
+        return len(self._levels) - 1
 
-        left_height: int = self.subtree_height(left) if left is not None else 0
-        right_height: int = self.subtree_height(right) if right is not None else 0
+    def level_sizes(self) -> List[int]:
+        """Returns the number of nodes at each depth, from the root down."""
+        return list(self._levels)
 
-        return 1 + max(left_height, right_height)
+    # Whole-Tree Queries
 
-    def height(self) -> int:
-        """Returns the height of the tree."""
-        p = self.root()
-        if p is None:
-            return -1
-        return self.subtree_height(p)
+    def leaf_count(self) -> int:
+        """Returns the number of nodes without children."""
+        if self._sparse:
+            return len(self._nodes_with_children(0))
+        mask = self._children_mask(0)
+        return int(mask.sum()) if np is not None else mask.count(1)
+
+    def leaves(self) -> List[int]:
+        """Returns the positions of all nodes without children, in index order."""
+        if self._sparse:
+            return self._nodes_with_children(0)
+        return _mask_positions(self._children_mask(0))
+
+    def single_child_nodes(self) -> List[int]:
+        """Returns the positions of all nodes with exactly one child, in index order."""
+        if self._sparse:
+            return self._nodes_with_children(1)
+        return _mask_positions(self._children_mask(1))
+
+    # Traversals
+
+    def preorder(self) -> Iterator[int]:
+        """Yields the positions of the tree in preorder."""
+        if self.is_empty():
+            return
+        get = self._get
+        stack = [0]
+        while stack:
+            p = stack.pop()
+            yield p
+            if get(2 * p + 2) is not None:
+                stack.append(2 * p + 2)
+            if get(2 * p + 1) is not None:
+                stack.append(2 * p + 1)
+
+    def inorder(self) -> Iterator[int]:
+        """Yields the positions of the tree in inorder."""
+        get = self._get
+        stack: List[int] = []
+        p = 0 if not self.is_empty() else None
+        while stack or p is not None:
+            if p is not None:
+                stack.append(p)
+                p = 2 * p + 1 if get(2 * p + 1) is not None else None
+            else:
+                p = stack.pop()
+                yield p
+                p = 2 * p + 2 if get(2 * p + 2) is not None else None
+
+    def postorder(self) -> Iterator[int]:
+        """Yields the positions of the tree in postorder."""
+        get = self._get
+        stack: List[int] = []
+        last = None
+        p = 0 if not self.is_empty() else None
+        while stack or p is not None:
+            if p is not None:
+                stack.append(p)
+                p = 2 * p + 1 if get(2 * p + 1) is not None else None
+            else:
+                top = stack[-1]
+                right = 2 * top + 2
+                if get(right) is not None and last != right:
+                    p = right
+                else:
+                    last = stack.pop()
+                    yield last
+
+    def breadthfirst(self) -> Iterator[int]:
+        """Yields the positions of the tree level by level."""
+        if self.is_empty():
+            return
+        get = self._get
+        level = [0]
+        while level:
+            next_level = []
+            for p in level:
+                yield p
+                if get(2 * p + 1) is not None:
+                    next_level.append(2 * p + 1)
+                if get(2 * p + 2) is not None:
+                    next_level.append(2 * p + 2)
+            level = next_level
 
     # Update Operations
 
@@ -116,9 +286,9 @@ class ArrayBinaryTree:
         """Adds a root to an empty tree and returns its position."""
         if not self.is_empty():
             raise ValueError("Tree is not empty.")
-        self._ensure_capacity(0)
-        self._data[0] = e
+        self._set(0, e)
         self._size = 1
+        self._levels = [1]
         return 0
 
     def add_left(self, p: int, e: Any) -> int:
@@ -127,9 +297,9 @@ class ArrayBinaryTree:
         if self.left(p) is not None:
             raise ValueError("Already includes left node")
         left = 2 * p + 1
-        self._ensure_capacity(left)
-        self._data[left] = e
+        self._set(left, e)
         self._size += 1
+        self._count_levels((left + 1).bit_length() - 1, [1])
         return left
 
     def add_right(self, p: int, e: Any) -> int:
@@ -138,15 +308,15 @@ class ArrayBinaryTree:
         if self.right(p) is not None:
             raise ValueError("Already includes right node")
         right = 2 * p + 2
-        self._ensure_capacity(right)
-        self._data[right] = e
+        self._set(right, e)
         self._size += 1
+        self._count_levels((right + 1).bit_length() - 1, [1])
         return right
 
     def replace(self, p: int, e: Any) -> None:
         """Replaces the element stored at position p."""
         p = self._validate(p)
-        self._data[p] = e
+        self._set(p, e)
 
     def delete(self, p: int) -> Any:
         """Deletes the node at position p and returns its element."""
@@ -155,66 +325,368 @@ class ArrayBinaryTree:
         if self.num_children(p) == 2:
             raise ValueError("Position has two children")
 
-        element = self._data[p]
+        element = self._get(p)
         child_index = self.left(p) if self.left(p) is not None else self.right(p)
 
+        depth = (p + 1).bit_length() - 1
         if child_index is not None:
-            self._move_subtree(child_index, p)
-        else:
-            self._data[p] = None
+            counts = self._relocate(self, child_index, p, move=True)
+            self._count_levels(depth + 1, counts, -1)
+            self._count_levels(depth, counts)
+        self._count_levels(depth, [1], -1)
+        if child_index is None:
+            self._clear(p)
 
         self._size -= 1
         return element
 
-    def attach(self, p: int, t1: ArrayBinaryTree, t2: ArrayBinaryTree) -> None:
+    def attach(self, p: int, t1: 'ArrayBinaryTree | None', t2: 'ArrayBinaryTree | None') -> None:
         """Attaches trees t1 and t2 as left and right subtrees of p."""
         p = self._validate(p)
         if self.left(p) is not None or self.right(p) is not None:
             raise ValueError(f"{p} must be a leaf.")
 
-        if t1 is not None:
-            self._copy_subtree(t1, t1.root(), 2 * p + 1)
-        if t2 is not None:
-            self._copy_subtree(t2, t2.root(), 2 * p + 2)
+        depth = (p + 1).bit_length() - 1
+        for t, child in ((t1, 2 * p + 1), (t2, 2 * p + 2)):
+            if t is not None and not t.is_empty():
+                counts = self._relocate(t, t.root(), child, move=False)
+                self._size += sum(counts)
+                self._count_levels(depth + 1, counts)
+
+    def detach(self, p: int) -> 'ArrayBinaryTree':
+        """Removes the subtree rooted at p and returns it as a new tree."""
+        p = self._validate(p)
+        tree = ArrayBinaryTree()
+        counts = tree._relocate(self, p, 0, move=True)
+        tree._size = sum(counts)
+        tree._levels = counts
+        self._size -= tree._size
+        self._count_levels((p + 1).bit_length() - 1, counts, -1)
+        return tree
+
+    # Serialization
+
+    def save(self, path: str) -> None:
+        """
+        Writes the tree to path in a compact binary format.
+
+        Positions are stored as an occupancy bitmap (one bit per slot, plus
+        the number of nodes before every 512-slot block), or as a pickled
+        index list for sparse storage. Values follow in index order, packed
+        as 64-bit integers or doubles when they all are of that type and
+        pickled otherwise.
+        """
+        positions = list(self._positions())
+        values = [self._get(i) for i in positions]
+        if all(type(v) is int and -2**63 <= v < 2**63 for v in values):
+            kind, packed = b'q', array('q', values).tobytes()
+        elif all(type(v) is float for v in values):
+            kind, packed = b'd', array('d', values).tobytes()
+        else:
+            kind, packed = b'p', pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+
+        # Sparse indices can exceed 64 bits, so their extent is recomputed on load
+        if self._sparse:
+            layout, extent, index = b'i', 0, pickle.dumps(positions, pickle.HIGHEST_PROTOCOL)
+        else:
+            extent = positions[-1] + 1 if positions else 0
+            bitmap = _pack_bits(self._occupancy()[:extent])
+            ranks = itertools.accumulate(
+                (int.from_bytes(bitmap[j:j + 64], 'little').bit_count() for j in range(0, len(bitmap), 64)),
+                initial=0
+            )
+            layout, index = b'b', bitmap + bytes(-len(bitmap) % 8) + array('q', ranks).tobytes()
+
+        header = ArrayBinaryTree._HEADER.pack(
+            ArrayBinaryTree.MAGIC, layout, kind, extent,
+            self._size, len(self._levels), len(index), len(packed)
+        )
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(bytes(-len(header) % 8))
+            f.write(array('q', self._levels).tobytes())
+            f.write(index)
+            f.write(bytes(-len(index) % 8))
+            f.write(packed)
+
+    @classmethod
+    def load(cls, path: str) -> 'ArrayBinaryTree':
+        """
+        Opens a tree written by save.
+
+        Trees saved with a bitmap are memory-mapped instead of rebuilt:
+        lookups read the bitmap and values straight from the file, and the
+        elements are copied into a list only when the tree is first
+        modified. Sparse trees are loaded into a dict.
+
+        Raises:
+            ValueError: If path does not contain a saved tree.
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, layout, kind, extent, size, num_levels, index_length, values_length = (
+            ArrayBinaryTree._HEADER.unpack_from(view)
+        )
+        if magic != ArrayBinaryTree.MAGIC:
+            raise ValueError(f"{path} does not contain a saved tree.")
+
+        offset = ArrayBinaryTree._HEADER.size
+        offset += -offset % 8
+        levels = view[offset:offset + 8 * num_levels].cast('q').tolist()
+        offset += 8 * num_levels
+        index = view[offset:offset + index_length]
+        offset += index_length + -index_length % 8
+        packed = view[offset:offset + values_length]
+        values = pickle.loads(packed) if kind == b'p' else packed.cast(kind.decode())
+
+        tree = cls()
+        tree._size = size
+        tree._levels = levels
+        tree._extent = extent
+        if layout == b'i':
+            positions = pickle.loads(index)
+            tree._data = dict(zip(positions, values))
+            tree._extent = positions[-1] + 1 if positions else 0
+            tree._sparse = True
+        else:
+            bitmap_length = -(-extent // 8)
+            bitmap = index[:bitmap_length]
+            start = bitmap_length + -bitmap_length % 8
+            ranks = index[start:].cast('q')
+            tree._data = _MappedLevelOrder(mapped, extent, bitmap, ranks, values)
+            tree._mapped = True
+        return tree
 
     # Utilities
 
     def _validate(self, p: int) -> int:
         """Validates position p."""
-        if self.is_empty() or p >= len(self._data) or self._data[p] is None:
+        if self.is_empty() or p < 0 or self._get(p) is None:
             raise ValueError("Position index is invalid.")
         return p
 
-    def _ensure_capacity(self, i: int) -> None:
-        """Ensures the underlying array can store index i."""
+    def _get(self, i: int) -> Any:
+        """Returns the element stored at index i or None if the slot is empty."""
+        if self._sparse:
+            return self._data.get(i)
+        return self._data[i] if i < len(self._data) else None
+
+    def _set(self, i: int, e: Any) -> None:
+        """Stores e at index i, growing or converting the storage if needed."""
+        if self._mapped:
+            self._materialize()
+        self._ensure_capacity(i)
+        self._data[i] = e
+        if not self._sparse:
+            self._occupied[i] = 1
+
+    def _clear(self, i: int) -> None:
+        """Empties the slot at index i."""
+        if self._mapped:
+            self._materialize()
+        if self._sparse:
+            self._data.pop(i, None)
+        elif i < len(self._data):
+            self._data[i] = None
+            self._occupied[i] = 0
+
+    def _positions(self) -> Iterator[int]:
+        """Yields the occupied indices in increasing order."""
+        if self._sparse:
+            yield from sorted(self._data)
+            return
+        occupied = self._occupancy()
+        i = occupied.find(1)
+        while i != -1:
+            yield i
+            i = occupied.find(1, i + 1)
+
+    def _occupancy(self) -> bytes | bytearray:
+        """Returns the occupancy bytes of dense (or memory-mapped) storage."""
+        return self._data.occupancy() if self._mapped else self._occupied
+
+    def _children_mask(self, wanted: int) -> Any:
+        """
+        Returns one byte per slot of dense storage, 1 where a node has
+        exactly wanted children (0 or 1). The occupancy of the left and
+        right children of all slots are the slices [1::2] and [2::2], which
+        line up with the parents once compared as whole arrays: NumPy arrays
+        if available, otherwise big integers holding one byte per slot.
+        """
+        occupied = self._occupancy()
+        if np is not None:
+            nodes = np.frombuffer(occupied, dtype=np.uint8)
+            children = np.zeros(len(nodes), dtype=np.uint8)
+            children[:len(nodes[1::2])] += nodes[1::2]
+            children[:len(nodes[2::2])] += nodes[2::2]
+            return nodes & (children == wanted)
+
+        nodes = int.from_bytes(occupied, 'little')
+        left = int.from_bytes(occupied[1::2], 'little')
+        right = int.from_bytes(occupied[2::2], 'little')
+        mask = nodes & ~(left | right) if wanted == 0 else nodes & (left ^ right)
+        return mask.to_bytes(len(occupied), 'little')
+
+    def _nodes_with_children(self, wanted: int) -> List[int]:
+        """Sparse version of the children mask: positions with wanted children."""
+        data = self._data
+        return sorted(i for i in data if (2 * i + 1 in data) + (2 * i + 2 in data) == wanted)
+
+    def _materialize(self) -> None:
+        """Copies the elements of a memory-mapped tree into a list."""
+        self._occupied = self._data.occupancy()
+        self._data = list(self._data)
+        self._mapped = False
+
+    def _count_levels(self, depth: int, counts: List[int], sign: int = 1) -> None:
+        """Adds (or with sign=-1 removes) counts[k] nodes at depth + k."""
+        levels = self._levels
+        if len(levels) < depth + len(counts):
+            levels.extend([0] * (depth + len(counts) - len(levels)))
+        for k, count in enumerate(counts):
+            levels[depth + k] += sign * count
+        while levels and levels[-1] == 0:
+            levels.pop()
+
+    def _ensure_capacity(self, i: int, incoming: int = 1) -> None:
+        """
+        Ensures the storage can hold index i, about to receive incoming new
+        nodes.
+
+        Dense storage grows by doubling, unless the grown list would be
+        mostly empty, in which case the tree switches to sparse storage.
+        Sparse storage switches back once the nodes fill at least
+        DENSE_RATIO of the index range.
+        """
+        if self._sparse:
+            self._extent = max(self._extent, i + 1)
+            if self._extent <= (self._size + incoming) / self.DENSE_RATIO:
+                self._to_dense()
+            return
+
         current_length: int = len(self._data)
         if i >= current_length:
+            new_length = max(2 * current_length, i + 1)
+            if (
+                new_length >= self.SPARSE_MIN_CAPACITY
+                and (self._size + incoming) / new_length < self.SPARSE_RATIO
+            ):
+                self._to_sparse()
+                self._extent = max(self._extent, i + 1)
+                return
             self._data.extend(
-                [None for _ in range(current_length, max(2 * current_length, i + 1))]
+                [None for _ in range(current_length, new_length)]
             )
+            self._occupied.extend(bytes(new_length - current_length))
+            self._extent = new_length
 
-    def _move_subtree(self, source_index: int, destination_index: int) -> None:
-        """Moves a subtree from source_index to destination_index."""
-        if source_index >= len(self._data) or self._data[source_index] is None:
-            return
+    def _to_sparse(self) -> None:
+        """Moves the elements from the list into a dict keyed by index."""
+        self._data = {i: val for i, val in enumerate(self._data) if val is not None}
+        self._occupied = bytearray()
+        self._sparse = True
+
+    def _to_dense(self) -> None:
+        """Moves the elements from the dict back into a list."""
+        data: List[Any] = [None] * self._extent
+        occupied = bytearray(self._extent)
+        for i, val in self._data.items():
+            data[i] = val
+            occupied[i] = 1
+        self._data = data
+        self._occupied = occupied
+        self._sparse = False
+
+    def _relocate(self, source: 'ArrayBinaryTree', src_p: int, dest_p: int, move: bool) -> List[int]:
+        """
+        Copies (or moves) the subtree rooted at src_p in source to dest_p in
+        this tree and returns the number of nodes on each of its levels.
+        Sizes and level counts are left to the caller.
 
-        self._data[destination_index] = self._data[source_index]
-        self._data[source_index] = None
+        Level k of the subtree rooted at p occupies the contiguous index
+        range starting at (p + 1) * 2^k - 1, so with dense storage every
+        level is read, cleared and written with one slice each. All levels
+        are read before anything is written, which makes moves towards an
+        ancestor (as in delete) safe. The destination subtree must be empty,
+        apart from nodes of the moved subtree itself.
+        """
+        if move and source._mapped:
+            source._materialize()
+        if self._mapped:
+            self._materialize()
+        if self._sparse or source._sparse:
+            return self._relocate_nodes(source, src_p, dest_p, move)
 
-        self._move_subtree(2 * source_index + 1, 2 * destination_index + 1)
-        self._move_subtree(2 * source_index + 2, 2 * destination_index + 2)
+        data = source._data
+        levels: List[List[Any]] = []
+        counts: List[int] = []
+        width = 1
+        while True:
+            start = (src_p + 1) * width - 1
+            if start >= len(data):
+                break
+            level = data[start:start + width]
+            if source._mapped:
+                occupied = bytes(map(operator.is_not, level, itertools.repeat(None)))
+            else:
+                occupied = source._occupied[start:start + width]
+            nodes = occupied.count(1)
+            if nodes == 0:
+                break
+            levels.append((level, occupied))
+            counts.append(nodes)
+            width *= 2
 
-    def _copy_subtree(self, source: ArrayBinaryTree, src_p: int, dest_p: int) -> None:
-        """Copies a subtree from source into this tree."""
-        queue = [(src_p, dest_p)]
-        while queue:
-            s, d = queue.pop(0)
-            if s < len(source._data) and source._data[s] is not None:
-                self._ensure_capacity(d)
-                self._data[d] = source._data[s]
-                self._size += 1
-                queue.append((2 * s + 1, 2 * d + 1))
-                queue.append((2 * s + 2, 2 * d + 2))
+        if not levels:
+            return counts
+        last = (dest_p + 1) * (width // 2) - 1 + len(levels[-1][0]) - 1
+        self._ensure_capacity(last, sum(counts))
+        if self._sparse:
+            return self._relocate_nodes(source, src_p, dest_p, move)
+
+        if move:
+            width = 1
+            for level, _ in levels:
+                start = (src_p + 1) * width - 1
+                data[start:start + len(level)] = [None] * len(level)
+                source._occupied[start:start + len(level)] = bytes(len(level))
+                width *= 2
+        width = 1
+        for level, occupied in levels:
+            start = (dest_p + 1) * width - 1
+            self._data[start:start + len(level)] = level
+            self._occupied[start:start + len(level)] = occupied
+            width *= 2
+        return counts
+
+    def _relocate_nodes(self, source: 'ArrayBinaryTree', src_p: int, dest_p: int, move: bool) -> List[int]:
+        """
+        Node-by-node version of _relocate for sparse storage, where level
+        slices would mostly consist of empty slots. Walks the subtree
+        breadth-first, level by level, without recursion.
+        """
+        nodes: List[tuple] = []
+        counts: List[int] = []
+        level = [(src_p, dest_p)]
+        while level:
+            next_level = []
+            for s, d in level:
+                element = source._get(s)
+                if element is not None:
+                    nodes.append((s, d, element))
+                    next_level.append((2 * s + 1, 2 * d + 1))
+                    next_level.append((2 * s + 2, 2 * d + 2))
+            if next_level:
+                counts.append(len(next_level) // 2)
+            level = next_level
+
+        if move:
+            for s, _, _ in nodes:
+                source._clear(s)
+        for _, d, element in nodes:
+            self._set(d, element)
+        return counts
 
     # Display
 
@@ -224,16 +696,599 @@ class ArrayBinaryTree:
             return "Empty Tree"
 
         result: List[str] = []
-        for i, val in enumerate(self._data):
-            if val is not None:
-                parent = self.parent(i) if i != 0 else None
-                left = self.left(i)
-                right = self.right(i)
-                result.append(
-                    f"Index {i}: {val} (parent: {parent}, left: {left}, right: {right})"
-                )
+        for i in self._positions():
+            val = self._get(i)
+            parent = self.parent(i) if i != 0 else None
+            left = self.left(i)
+            right = self.right(i)
+            result.append(
+                f"Index {i}: {val} (parent: {parent}, left: {left}, right: {right})"
+            )
         return "\n".join(result)
 
+class _MappedLevelOrder:
+    """
+    Read-only sequence over the slots of a tree saved with a bitmap, backed
+    by the memory-mapped file. Slot i holds values[rank(i)] if bit i of the
+    bitmap is set (rank(i) being the number of set bits before it) and None
+    otherwise.
+    """
+
+    def __init__(self, mapped: mmap.mmap, extent: int, bitmap: memoryview, ranks: memoryview, values: Any) -> None:
+        self._mapped = mapped
+        self._extent = extent
+        self._bitmap = bitmap
+        self._ranks = ranks
+        self._values = values
+
+    def __len__(self) -> int:
+        return self._extent
+
+    def __getitem__(self, i: int | slice) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._extent))]
+        byte = self._bitmap[i >> 3]
+        if not byte >> (i & 7) & 1:
+            return None
+        block = i >> 9
+        rank = (
+            self._ranks[block]
+            + int.from_bytes(self._bitmap[block << 6:i >> 3], 'little').bit_count()
+            + (byte & ((1 << (i & 7)) - 1)).bit_count()
+        )
+        return self._values[rank]
+
+    def occupancy(self) -> bytearray:
+        """Returns one byte per slot, 1 where the slot holds a node."""
+        return _unpack_bits(self._bitmap, self._extent)
+
+    def __iter__(self) -> Iterator[Any]:
+        values = iter(self._values)
+        i = 0
+        for byte in self._bitmap:
+            for bit in range(min(8, self._extent - i)):
+                yield next(values) if byte >> bit & 1 else None
+            i += 8
+
+def _pack_bits(occupied: bytes | bytearray) -> bytes:
+    """Packs one byte per slot (0 or 1) into a bitmap, slot i at bit i % 8 of byte i // 8."""
+    occupied = bytes(occupied) + bytes(-len(occupied) % 8)
+    bits = 0
+    for k in range(8):
+        bits |= int.from_bytes(occupied[k::8], 'little') << k
+    return bits.to_bytes(len(occupied) // 8, 'little')
+
+def _unpack_bits(bitmap: bytes | memoryview, n: int) -> bytearray:
+    """Inverse of _pack_bits for the first n slots."""
+    bits = int.from_bytes(bitmap, 'little')
+    ones = int.from_bytes(b'\x01' * len(bitmap), 'little')
+    occupied = bytearray(8 * len(bitmap))
+    for k in range(8):
+        occupied[k::8] = (bits >> k & ones).to_bytes(len(bitmap), 'little')
+    del occupied[n:]
+    return occupied
+
+def _mask_positions(mask: Any) -> List[int]:
+    """Returns the indices of the nonzero bytes of a mask from _children_mask."""
+    if np is not None:
+        return np.flatnonzero(mask).tolist()
+    positions = []
+    i = mask.find(1)
+    while i != -1:
+        positions.append(i)
+        i = mask.find(1, i + 1)
+    return positions
+
+class ArrayHeap(ArrayBinaryTree):
+    """
+    Indexed min-heap stored in the array layout of ArrayBinaryTree.
+
+    The tree elements are the heap items and a parallel list holds their
+    keys. Every item may appear only once, so it doubles as a handle: a
+    dict maps each item to its current position, which lets decrease_key,
+    increase_key and remove find an item in O(1) before restoring heap
+    order in O(log n).
+
+    With fanout d the children of position p are d * p + 1 ... d * p + d.
+    A fanout of 4 gives a shallower heap and keeps the children of a node
+    next to each other in memory. The position accessors follow the fanout;
+    left and right return the first two children. The structural updates
+    of ArrayBinaryTree are not available, since heap order decides where
+    every item goes.
+    """
+
+    def __init__(self, items: Iterable[tuple] = (), fanout: int = 2) -> None:
+        """
+        Initialize a heap from (key, item) pairs.
+
+        Raises:
+            ValueError: If fanout is less than 2 or an item appears twice.
+        """
+        super().__init__()
+        if fanout < 2:
+            raise ValueError("Fanout must be at least 2.")
+        self._fanout: int = fanout
+        self._keys: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        self.heapify(items)
+
+    def _unsupported(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError("Heap positions are managed by the heap; use push and pop.")
+
+    add_root = add_left = add_right = delete = attach = detach = _unsupported
+    from_level_order = save = load = _unsupported
+
+    # Heap Operations
+
+    def heapify(self, items: Iterable[tuple]) -> None:
+        """
+        Replaces the contents of the heap with (key, item) pairs in O(n).
+
+        Raises:
+            ValueError: If an item is None or appears twice.
+        """
+        pairs = list(items)
+        self._keys = [key for key, _ in pairs]
+        self._data = [item for _, item in pairs]
+        self._index = {item: i for i, item in enumerate(self._data)}
+        if len(self._index) != len(self._data) or None in self._index:
+            self._data, self._keys, self._index, self._size = [], [], {}, 0
+            raise ValueError("Items must be unique and not None.")
+        self._size = len(self._data)
+        for p in reversed(range((self._size - 2) // self._fanout + 1)):
+            self._sift_down(p)
+
+    def min(self) -> tuple:
+        """
+        Returns (but does not remove) the (key, item) pair with the smallest key.
+
+        Raises:
+            ValueError: If the heap is empty.
+        """
+        if self.is_empty():
+            raise ValueError("Heap is empty.")
+        return self._keys[0], self._data[0]
+
+    def push(self, key: Any, item: Any) -> None:
+        """
+        Adds item with the given key.
+
+        Raises:
+            ValueError: If item is None or already in the heap.
+        """
+        self._check_new(item)
+        self._data.append(item)
+        self._keys.append(key)
+        self._index[item] = self._size
+        self._size += 1
+        self._sift_up(self._size - 1)
+
+    def pop(self) -> tuple:
+        """
+        Removes and returns the (key, item) pair with the smallest key.
+
+        Raises:
+            ValueError: If the heap is empty.
+        """
+        top = self.min()
+        last_item = self._data.pop()
+        last_key = self._keys.pop()
+        del self._index[top[1]]
+        self._size -= 1
+        if self._size:
+            self._data[0] = last_item
+            self._keys[0] = last_key
+            self._index[last_item] = 0
+            self._sift_down(0)
+        return top
+
+    def pushpop(self, key: Any, item: Any) -> tuple:
+        """
+        Pushes item and then pops the smallest pair, faster than calling
+        push and pop.
+
+        Raises:
+            ValueError: If item is None or already in the heap.
+        """
+        self._check_new(item)
+        if self.is_empty() or not self._keys[0] < key:
+            return key, item
+        top = self._keys[0], self._data[0]
+        del self._index[top[1]]
+        self._data[0] = item
+        self._keys[0] = key
+        self._index[item] = 0
+        self._sift_down(0)
+        return top
+
+    def replace(self, key: Any, item: Any) -> tuple:
+        """
+        Pops the smallest pair and then pushes item, faster than calling pop
+        and push. The returned pair may have a larger key than item.
+
+        Raises:
+            ValueError: If the heap is empty, or item is None or already in
+                the heap.
+        """
+        top = self.min()
+        if item != top[1]:
+            self._check_new(item)
+        del self._index[top[1]]
+        self._data[0] = item
+        self._keys[0] = key
+        self._index[item] = 0
+        self._sift_down(0)
+        return top
+
+    def __contains__(self, item: Any) -> bool:
+        """Returns True if item is in the heap."""
+        return item in self._index
+
+    def key(self, item: Any) -> Any:
+        """
+        Returns the key of item.
+
+        Raises:
+            ValueError: If item is not in the heap.
+        """
+        return self._keys[self._position(item)]
+
+    def decrease_key(self, item: Any, key: Any) -> None:
+        """
+        Lowers the key of item.
+
+        Raises:
+            ValueError: If item is not in the heap or key is larger than
+                its current key.
+        """
+        p = self._position(item)
+        if self._keys[p] < key:
+            raise ValueError("New key is larger than the current key.")
+        self._keys[p] = key
+        self._sift_up(p)
+
+    def increase_key(self, item: Any, key: Any) -> None:
+        """
+        Raises the key of item.
+
+        Raises:
+            ValueError: If item is not in the heap or key is smaller than
+                its current key.
+        """
+        p = self._position(item)
+        if key < self._keys[p]:
+            raise ValueError("New key is smaller than the current key.")
+        self._keys[p] = key
+        self._sift_down(p)
+
+    def remove(self, item: Any) -> Any:
+        """
+        Removes item from the heap and returns its key.
+
+        Raises:
+            ValueError: If item is not in the heap.
+        """
+        p = self._position(item)
+        key = self._keys[p]
+        del self._index[item]
+        last_item = self._data.pop()
+        last_key = self._keys.pop()
+        self._size -= 1
+        if p < self._size:
+            self._data[p] = last_item
+            self._keys[p] = last_key
+            self._index[last_item] = p
+            self._sift_up(p)
+            self._sift_down(self._index[last_item])
+        return key
+
+    # Accessors
+
+    def parent(self, p: int) -> int | None:
+        """Returns the parent position of p or None if p is root."""
+        p = self._validate(p)
+        return None if p == 0 else (p - 1) // self._fanout
+
+    def left(self, p: int) -> int | None:
+        """Returns the first child of p or None if it does not exist."""
+        p = self._validate(p)
+        first = self._fanout * p + 1
+        return first if first < self._size else None
+
+    def right(self, p: int) -> int | None:
+        """Returns the second child of p or None if it does not exist."""
+        p = self._validate(p)
+        second = self._fanout * p + 2
+        return second if second < self._size else None
+
+    def children(self, p: int) -> List[int | None]:
+        """Returns a list of the fanout child positions of p (None if absent)."""
+        p = self._validate(p)
+        first = self._fanout * p + 1
+        return [c if c < self._size else None for c in range(first, first + self._fanout)]
+
+    def num_children(self, p: int) -> int:
+        """Returns the number of children of p."""
+        p = self._validate(p)
+        first = self._fanout * p + 1
+        return max(0, min(self._fanout, self._size - first))
+
+    def depth(self, p: int) -> int:
+        """Returns the depth of position p."""
+        p = self._validate(p)
+        depth, first, width = 0, 0, 1
+        while p >= first + width:
+            first += width
+            width *= self._fanout
+            depth += 1
+        return depth
+
+    def subtree_height(self, p: int) -> int:
+        """Returns the height of the subtree rooted at p."""
+        p = self._validate(p)
+        height = 0
+        while self._fanout * p + 1 < self._size:
+            p = self._fanout * p + 1
+            height += 1
+        return height
+
+    def height(self) -> int:
+        """Returns the height of the heap."""
+        return self.depth(self._size - 1) if self._size else -1
+
+    def level_sizes(self) -> List[int]:
+        """Returns the number of items at each depth, from the root down."""
+        sizes: List[int] = []
+        first, width = 0, 1
+        while first < self._size:
+            sizes.append(min(width, self._size - first))
+            first += width
+            width *= self._fanout
+        return sizes
+
+    # Traversals
+
+    def preorder(self) -> Iterator[int]:
+        """Yields the positions of the heap in preorder."""
+        d, n = self._fanout, self._size
+        stack = [0] if n else []
+        while stack:
+            p = stack.pop()
+            yield p
+            first = d * p + 1
+            stack.extend(range(min(first + d, n) - 1, first - 1, -1))
+
+    def inorder(self) -> Iterator[int]:
+        """
+        Yields the positions of the heap in inorder.
+
+        Raises:
+            TypeError: If the fanout is not 2.
+        """
+        if self._fanout != 2:
+            raise TypeError("Inorder traversal needs a fanout of 2.")
+        yield from super().inorder()
+
+    def postorder(self) -> Iterator[int]:
+        """Yields the positions of the heap in postorder."""
+        d, n = self._fanout, self._size
+        stack = [(0, False)] if n else []
+        while stack:
+            p, expanded = stack.pop()
+            if expanded:
+                yield p
+                continue
+            stack.append((p, True))
+            first = d * p + 1
+            stack.extend((c, False) for c in range(min(first + d, n) - 1, first - 1, -1))
+
+    def breadthfirst(self) -> Iterator[int]:
+        """Yields the positions of the heap level by level."""
+        return iter(range(self._size))
+
+    # Whole-Tree Queries
+
+    def leaf_count(self) -> int:
+        """Returns the number of positions without children."""
+        return len(self.leaves())
+
+    def leaves(self) -> List[int]:
+        """Returns the positions without children, which form a suffix of the heap."""
+        return list(range((self._size - 2) // self._fanout + 1 if self._size > 1 else 0, self._size))
+
+    def single_child_nodes(self) -> List[int]:
+        """Returns the positions with exactly one child (at most one, the last parent)."""
+        if self._size < 2:
+            return []
+        last_parent = (self._size - 2) // self._fanout
+        return [last_parent] if self._size - 1 - self._fanout * last_parent == 1 else []
+
+    # Utilities
+
+    def _positions(self) -> Iterator[int]:
+        """Yields the occupied indices in increasing order."""
+        return iter(range(self._size))
+
+    def _check_new(self, item: Any) -> None:
+        """Validates an item that is about to be added."""
+        if item is None:
+            raise ValueError("Items must not be None.")
+        if item in self._index:
+            raise ValueError("Item is already in the heap.")
+
+    def _position(self, item: Any) -> int:
+        """Returns the position of item."""
+        try:
+            return self._index[item]
+        except KeyError:
+            raise ValueError("Item is not in the heap.") from None
+
+    def _sift_up(self, p: int) -> None:
+        """Moves the item at p up until its parent has no larger key."""
+        data, keys, index, d = self._data, self._keys, self._index, self._fanout
+        item, key = data[p], keys[p]
+        while p > 0:
+            parent = (p - 1) // d
+            if not key < keys[parent]:
+                break
+            data[p] = data[parent]
+            keys[p] = keys[parent]
+            index[data[p]] = p
+            p = parent
+        data[p] = item
+        keys[p] = key
+        index[item] = p
+
+    def _sift_down(self, p: int) -> None:
+        """Moves the item at p down until no child has a smaller key."""
+        data, keys, index, d, n = self._data, self._keys, self._index, self._fanout, self._size
+        item, key = data[p], keys[p]
+        while True:
+            first = d * p + 1
+            if first >= n:
+                break
+            if d == 2:
+                child = first + 1 if first + 1 < n and keys[first + 1] < keys[first] else first
+            else:
+                child = min(range(first, min(first + d, n)), key=keys.__getitem__)
+            if not keys[child] < key:
+                break
+            data[p] = data[child]
+            keys[p] = keys[child]
+            index[data[p]] = p
+            p = child
+        data[p] = item
+        keys[p] = key
+        index[item] = p
+
+def _build_tree(tree: ArrayBinaryTree, shape: str, n: int) -> ArrayBinaryTree:
+    """
+    Fills tree with n nodes in one of three shapes: 'complete' (level
+    order), 'random' (each node hangs off a random descent from the root)
+    or 'degenerate' (a single path of alternating left and right children).
+    """
+    tree.add_root(0)
+    if shape == 'complete':
+        for i in range(1, n):
+            parent = (i - 1) // 2
+            if i % 2:
+                tree.add_left(parent, i)
+            else:
+                tree.add_right(parent, i)
+    elif shape == 'random':
+        rng = random.Random(n)
+        for i in range(1, n):
+            p = 0
+            while True:
+                go_left = rng.random() < 0.5
+                child = tree.left(p) if go_left else tree.right(p)
+                if child is None:
+                    break
+                p = child
+            if go_left:
+                tree.add_left(p, i)
+            else:
+                tree.add_right(p, i)
+    else:
+        p = 0
+        for i in range(1, n):
+            p = tree.add_left(p, i) if i % 2 else tree.add_right(p, i)
+    return tree
+
+def benchmark_storage(n: int = 100_000, depth: int = 1000, dense_depth_limit: int = 22) -> None:
+    """
+    Compares the memory footprint, build time and lookup time of dense-only
+    and adaptive storage for complete and random trees of n nodes and a
+    degenerate tree of the given depth.
+
+    Dense-only storage builds the degenerate tree only down to
+    dense_depth_limit, since it needs about 2^depth slots.
+    """
+    class DenseOnlyTree(ArrayBinaryTree):
+        SPARSE_RATIO = 0
+
+    for shape in ('complete', 'random', 'degenerate'):
+        for name, cls in (('dense', DenseOnlyTree), ('adaptive', ArrayBinaryTree)):
+            if shape != 'degenerate':
+                nodes = n
+            elif cls is DenseOnlyTree:
+                nodes = min(depth, dense_depth_limit)
+            else:
+                nodes = depth
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            tree = _build_tree(cls(), shape, nodes)
+            build = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            positions = list(tree._positions())
+            start = time.perf_counter()
+            for p in positions:
+                tree.left(p)
+                tree.right(p)
+            lookup = time.perf_counter() - start
+
+            mode = 'sparse' if tree.is_sparse() else 'dense'
+            print(
+                f'{shape:>10} {name:>8} ({nodes:,} nodes, {mode}): '
+                f'peak {peak / 2**20:8.1f} MiB, build {build:6.3f} s, '
+                f'left/right {lookup / len(positions) * 1e9:5.0f} ns/node'
+            )
+
+def benchmark_heap(vertices: int = 200_000, edges: int = 2_000_000) -> None:
+    """
+    Runs Dijkstra's algorithm on a random graph with heapq (pushing a new
+    entry per key update and skipping stale ones) and with ArrayHeap
+    (decrease_key) for fanouts 2 and 4.
+    """
+    rng = random.Random(vertices)
+    graph: List[List[tuple]] = [[] for _ in range(vertices)]
+    for _ in range(edges):
+        graph[rng.randrange(vertices)].append((rng.randrange(vertices), rng.random()))
+    infinity = float('inf')
+
+    def with_heapq() -> Dict[int, float]:
+        distance = {0: 0.0}
+        done = set()
+        heap = [(0.0, 0)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            for v, w in graph[u]:
+                if d + w < distance.get(v, infinity):
+                    distance[v] = d + w
+                    heapq.heappush(heap, (d + w, v))
+        return distance
+
+    def with_array_heap(fanout: int) -> Dict[int, float]:
+        distance = {0: 0.0}
+        heap = ArrayHeap([(0.0, 0)], fanout)
+        while heap:
+            d, u = heap.pop()
+            for v, w in graph[u]:
+                if d + w < distance.get(v, infinity):
+                    distance[v] = d + w
+                    if v in heap:
+                        heap.decrease_key(v, d + w)
+                    else:
+                        heap.push(d + w, v)
+        return distance
+
+    runs = [('heapq', with_heapq)]
+    runs += [(f'ArrayHeap (fanout {d})', lambda d=d: with_array_heap(d)) for d in (2, 4)]
+    expected = None
+    for name, run in runs:
+        start = time.perf_counter()
+        distance = run()
+        elapsed = time.perf_counter() - start
+        expected = expected or distance
+        assert distance == expected
+        print(f'{name}: {elapsed:.2f} s ({vertices:,} vertices, {edges:,} edges)')
+
 def run_tests():
     t = ArrayBinaryTree()
 
@@ -309,4 +1364,79 @@ def run_tests():
 
     print()
 
-run_tests()
\ No newline at end of file
+    print("Traversals")
+    print("preorder:", [t._get(p) for p in t.preorder()])
+    print("inorder:", [t._get(p) for p in t.inorder()])
+    print("postorder:", [t._get(p) for p in t.postorder()])
+    print("breadthfirst:", [t._get(p) for p in t.breadthfirst()])
+    print("level sizes:", t.level_sizes())
+    print()
+
+    print("Whole-tree queries")
+    print("leaf count:", t.leaf_count())
+    print("leaves:", t.leaves())
+    print("single child nodes:", t.single_child_nodes())
+    print("level sizes:", t.level_sizes())
+    print("fill ratio:", t.fill_ratio())
+    print()
+
+    print("Detach test")
+    detached = t.detach(leaf)
+    print("detached subtree:")
+    print(detached)
+    print("len after detach:", len(t))
+    print("len of detached:", len(detached))
+    print()
+
+    print("Level order construction and serialization")
+    built = ArrayBinaryTree.from_level_order(["A", "B", "C", "#", "D", "#", "E"], missing="#")
+    print("preorder:", [built._get(p) for p in built.preorder()])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tree.bin")
+        built.save(path)
+        loaded = ArrayBinaryTree.load(path)
+        print("loaded preorder:", [loaded._get(p) for p in loaded.preorder()])
+        print("loaded height:", loaded.height())
+        loaded.add_left(loaded.left(0), "F")
+        print("after adding F:", [loaded._get(p) for p in loaded.breadthfirst()])
+    print()
+
+    print("Heap")
+    h = ArrayHeap([(5, "E"), (3, "C"), (8, "H"), (1, "A")])
+    h.push(4, "D")
+    print("min:", h.min())
+    h.decrease_key("H", 2)
+    h.increase_key("A", 6)
+    print("removed C with key:", h.remove("C"))
+    print("pushpop(0, 'Z'):", h.pushpop(0, "Z"))
+    print("replace(7, 'G'):", h.replace(7, "G"))
+    print("pops:", [h.pop() for _ in range(len(h))])
+    try:
+        h.add_root("X")
+    except TypeError as e:
+        print("Caught exception on add_root:", e)
+    print()
+
+    print("Sparse storage")
+    deep = ArrayBinaryTree()
+    p = deep.add_root(0)
+    for i in range(1, 100):
+        p = deep.add_right(p, i)
+    print("is_sparse:", deep.is_sparse())
+    print("deepest index:", p)
+    print("height:", deep.height())
+    print("len:", len(deep))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "deep.bin")
+        deep.save(path)
+        loaded = ArrayBinaryTree.load(path)
+        print("loaded deepest element:", loaded._get(p))
+        print("loaded height:", loaded.height())
+    print()
+
+if __name__ == '__main__':
+    if '--benchmark' in sys.argv[1:]:
+        benchmark_storage()
+        benchmark_heap()
+    else:
+        run_tests()
\ No newline at end of file